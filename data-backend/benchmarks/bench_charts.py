@@ -0,0 +1,246 @@
+"""
+Render every chart type with plot_chart and record what each one costs.
+
+Run from data-backend/:
+    python -m benchmarks.bench_charts                                   # full matrix
+    python -m benchmarks.bench_charts --rows 10000 --charts scatter swarm
+    python -m benchmarks.bench_charts --save benchmarks/chart_baseline.json
+    python -m benchmarks.bench_charts --compare benchmarks/chart_baseline.json
+
+Every case (chart x rows x hue levels) runs in a fresh process and goes the
+way a chart worker renders it: point-budget sampling (see
+functions/sampling.py, --raw skips it), plot_chart, PNG encoding. For each
+case it records the wall time of that, the peak RSS of the process (and
+how far rendering raised it above building the frame, 0 if it did not) and
+the PNG size. The frames are synthetic: normal x/y/z/w columns, a sorted t for
+lines, an 8-level category c and a hue column with --hues levels (0 = no
+hue). Heatmaps are drawn from the Pearson matrix, computed the way
+/correlation computes it on a cache miss, as the chart workers do.
+
+--compare re-runs the cases of a saved baseline and exits with status 1
+when one got slower, bigger in memory or failed (beyond --tolerance, with
+some absolute slack for sub-second timings). Baselines are only comparable
+on the machine and library versions they were recorded with, so --compare
+refuses (status 2) to run against one recorded elsewhere, and reuses its
+dpi, sampling and per-case timeout. Record baselines locally; they are
+not committed.
+"""
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import platform
+import queue
+import resource
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+CHARTS = {
+    "scatter":   dict(x="x", y="y", hue=True),
+    "line":      dict(x="t", y="y", hue=True),
+    "bar":       dict(x="c", y="y", hue=True),
+    "count":     dict(x="c", hue=True),
+    "histogram": dict(x="x", hue=True),
+    "boxplot":   dict(x="c", y="y", hue=True),
+    "violin":    dict(x="c", y="y", hue=True),
+    "strip":     dict(x="c", y="y", hue=True),
+    "swarm":     dict(x="c", y="y", hue=True),
+    "heatmap":   dict(cols=["x", "y", "z", "w", "t"]),
+    "pair":      dict(cols=["x", "y", "z"], hue=True),
+    "joint":     dict(x="x", y="y", hue=True),
+    "pie":       dict(x="c", hue=True),
+}
+ROWS = [10_000, 100_000, 1_000_000]
+HUES = [0, 3, 20]
+SLACK_SECONDS = 0.25
+SLACK_MB = 20
+
+
+def make_chart_frame(rows: int, hues: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    x = rng.normal(50, 10, rows)
+    frame = pd.DataFrame({
+        "x": x,
+        "y": 0.5 * x + rng.normal(0, 5, rows),
+        "z": rng.exponential(10, rows),
+        "w": rng.integers(0, 100, rows),
+        "t": np.sort(rng.uniform(0, 1000, rows)),
+        "c": pd.Categorical(rng.choice([f"c{i}" for i in range(8)], rows)),
+    })
+    if hues:
+        frame["h"] = pd.Categorical(rng.choice([f"h{i}" for i in range(hues)], rows))
+    return frame
+
+
+def _options(chart: str, hues: int) -> dict:
+    options = dict(CHARTS[chart])
+    if options.pop("hue", False) and hues:
+        options["hue"] = "h"
+    if chart == "pair" and hues:
+        options["cols"] = options["cols"] + ["h"]
+    return options
+
+
+def _peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+
+
+def _case(chart: str, rows: int, hues: int, dpi: int, raw: bool, results):
+    warnings.filterwarnings("ignore")
+    import matplotlib
+    matplotlib.use("Agg")
+    from main.functions.charts import plot_chart, use_style
+    from main.functions.sampling import downsample
+    use_style()
+
+    data = make_chart_frame(rows, hues)
+    options = _options(chart, hues)
+    setup_mb = _peak_rss_mb()
+
+    with open(os.devnull, "w") as quiet, contextlib.redirect_stdout(quiet):  # plot_chart's progress prints
+        start = time.perf_counter()
+        sampling = None
+        if chart == "heatmap":
+            from main.functions.correlation import as_matrix, pearson
+            cols = options["cols"]
+            corr = pd.DataFrame(pearson(as_matrix(data[cols])), index=cols, columns=cols)
+            png = plot_chart(corr, chart, **options, corr=corr, as_bytes=True, dpi=dpi)
+        else:
+            if not raw:
+                data, sampling = downsample(data, chart, **options)
+            png = plot_chart(data, chart, **options, as_bytes=True, dpi=dpi)
+        seconds = time.perf_counter() - start
+
+    results.put({
+        "seconds": round(seconds, 3),
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+        "render_rss_mb": round(_peak_rss_mb() - setup_mb, 1),
+        "png_bytes": len(png),
+        "points": len(data) if sampling else rows,
+    })
+
+
+def run_case(chart: str, rows: int, hues: int, dpi: int = 300, raw: bool = False, timeout: float = 600) -> dict:
+    """One case in its own process, so peak RSS belongs to it alone."""
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    process = context.Process(target=_case, args=(chart, rows, hues, dpi, raw, results))
+    process.start()
+    case = {"chart": chart, "rows": rows, "hues": hues, "status": "timeout"}
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            case.update(results.get(timeout=1), status="ok")
+            break
+        except queue.Empty:
+            if not process.is_alive():
+                try:
+                    case.update(results.get(timeout=1), status="ok")
+                except queue.Empty:
+                    case["status"] = "failed"  # the traceback is on stderr
+                break
+    process.kill()
+    process.join()
+    return case
+
+
+def environment(dpi: int, raw: bool, timeout: float) -> dict:
+    import matplotlib
+    import seaborn
+    return {
+        "dpi": dpi,
+        "sampled": not raw,
+        "timeout": timeout,
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpus": os.cpu_count(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "matplotlib": matplotlib.__version__,
+        "seaborn": seaborn.__version__,
+    }
+
+
+def regressions(baseline: dict, case: dict, tolerance: float) -> list:
+    problems = []
+    if case["status"] != "ok":
+        if baseline["status"] == "ok":
+            problems.append(case["status"])
+        return problems
+    if baseline["status"] != "ok":
+        return problems
+    if case["seconds"] > baseline["seconds"] * tolerance + SLACK_SECONDS:
+        problems.append(f"time {baseline['seconds']:.2f}s -> {case['seconds']:.2f}s")
+    if case["peak_rss_mb"] > baseline["peak_rss_mb"] * tolerance + SLACK_MB:
+        problems.append(f"rss {baseline['peak_rss_mb']:.0f} -> {case['peak_rss_mb']:.0f} MB")
+    return problems
+
+
+def _row(case: dict, note: str = "") -> str:
+    if case["status"] != "ok":
+        return f"{case['chart']:<10} {case['rows']:>9,} {case['hues']:>4} {case['status']:>9}   {note}"
+    return (f"{case['chart']:<10} {case['rows']:>9,} {case['hues']:>4} {case['seconds']:>9.2f} "
+            f"{case['peak_rss_mb']:>9.0f} {case['render_rss_mb']:>9.0f} {case['png_bytes'] / 1e3:>9.0f} "
+            f"{case['points']:>9,}   {note}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--charts", nargs="+", choices=list(CHARTS), default=list(CHARTS))
+    parser.add_argument("--rows", nargs="+", type=int, default=ROWS)
+    parser.add_argument("--hues", nargs="+", type=int, default=HUES, help="hue levels, 0 = no hue")
+    parser.add_argument("--dpi", type=int, default=300)
+    parser.add_argument("--raw", action="store_true", help="skip point-budget sampling")
+    parser.add_argument("--timeout", type=float, default=600, help="seconds per case")
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON file to re-run and compare against")
+    parser.add_argument("--tolerance", type=float, default=1.25)
+    args = parser.parse_args()
+
+    baseline = None
+    cases = [(chart, rows, hues) for rows in args.rows for hues in args.hues for chart in args.charts]
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        recorded = baseline["environment"]
+        args.dpi, args.raw = recorded["dpi"], not recorded["sampled"]
+        args.timeout = recorded.get("timeout", args.timeout)
+        here = environment(args.dpi, args.raw, args.timeout)
+        differs = [k for k in sorted(set(recorded) | set(here)) if recorded.get(k) != here.get(k)]
+        if differs:
+            for k in differs:
+                print(f"{k}: baseline {recorded.get(k)!r}, here {here.get(k)!r}")
+            print("The baseline was recorded elsewhere; record one here with --save.")
+            raise SystemExit(2)
+        cases = [(c["chart"], c["rows"], c["hues"]) for c in baseline["results"]]
+        before = {(c["chart"], c["rows"], c["hues"]): c for c in baseline["results"]}
+
+    print(f"{'chart':<10} {'rows':>9} {'hues':>4} {'time (s)':>9} {'peak (MB)':>9} {'render':>9} "
+          f"{'png (KB)':>9} {'points':>9}")
+    results, failed = [], 0
+    for chart, rows, hues in cases:
+        case = run_case(chart, rows, hues, args.dpi, args.raw, args.timeout)
+        note = ""
+        if baseline is not None:
+            problems = regressions(before[(chart, rows, hues)], case, args.tolerance)
+            failed += bool(problems)
+            note = "REGRESSION: " + ", ".join(problems) if problems else ""
+        print(_row(case, note), flush=True)
+        results.append(case)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"environment": environment(args.dpi, args.raw, args.timeout), "results": results}, f, indent=1)
+            f.write("\n")
+    if baseline is not None:
+        print(f"\n{failed} of {len(cases)} cases regressed (tolerance {args.tolerance}x)")
+        raise SystemExit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
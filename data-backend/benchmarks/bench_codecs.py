@@ -0,0 +1,55 @@
+"""
+Compare the DataFrame storage codecs used by df_manager.
+
+Run from data-backend/:
+    python -m benchmarks.bench_codecs --rows 1000000
+
+The frame is the sample dataset (main/data.csv) tiled up to the requested
+row count, so the column mix matches what /upload stores in Redis.
+"""
+import argparse
+import os
+import time
+
+import pandas as pd
+
+from main.redis_utils.codecs import CODECS, encode_df, decode_df
+
+SAMPLE_CSV = os.path.join(os.path.dirname(__file__), "..", "main", "data.csv")
+
+
+def make_frame(rows: int) -> pd.DataFrame:
+    sample = pd.read_csv(SAMPLE_CSV)
+    repeats = -(-rows // len(sample))
+    return pd.concat([sample] * repeats, ignore_index=True).iloc[:rows]
+
+
+def best_of(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    df = make_frame(args.rows)
+    print(f"{len(df):,} rows x {df.shape[1]} columns, "
+          f"{df.memory_usage(deep=True).sum() / 1e6:.1f} MB in memory\n")
+    print(f"{'codec':<8} {'encode (s)':>11} {'decode (s)':>11} {'size (MB)':>10}")
+
+    for name in CODECS:
+        payload = encode_df(df, codec=name)
+        encode_s = best_of(lambda: encode_df(df, codec=name), args.repeat)
+        decode_s = best_of(lambda: decode_df(payload), args.repeat)
+        print(f"{name:<8} {encode_s:>11.3f} {decode_s:>11.3f} {len(payload) / 1e6:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
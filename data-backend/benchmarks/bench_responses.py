@@ -0,0 +1,52 @@
+"""
+Compare the old records + middleware re-encode path with DataFrameResponse.
+
+Run from data-backend/:
+    python -m benchmarks.bench_responses --rows 1000000
+
+"records" reproduces what /raw-data used to do: a NaN->None `where` copy,
+`to_dict(orient="records")`, JSONResponse rendering, then ResponseMiddleware
+decoding the body and encoding the envelope again. "columnar" is the
+DataFrameResponse body, encoded once with orjson.
+"""
+import argparse
+import json
+import time
+
+import pandas as pd
+from fastapi.responses import JSONResponse
+
+from benchmarks.bench_codecs import SAMPLE_CSV, best_of, make_frame
+from main.middleware.response import APIResponse
+from main.utils.df_response import DataFrameResponse
+
+
+def records_path(df: pd.DataFrame) -> bytes:
+    clean = df.where(pd.notnull(df), None)
+    body = JSONResponse({"data": clean.to_dict(orient="records"), "message": "OK"}).body
+    payload = json.loads(body.decode())
+    envelope = APIResponse(success=True, data=payload["data"], message=payload["message"])
+    return JSONResponse(content=envelope.dict()).body
+
+
+def columnar_path(df: pd.DataFrame) -> bytes:
+    return DataFrameResponse(df, message="OK").body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    frames = {"sample": pd.read_csv(SAMPLE_CSV), "synthetic": make_frame(args.rows)}
+    print(f"{'frame':<10} {'rows':>9} {'path':<9} {'time (s)':>9} {'size (MB)':>10}")
+    for label, df in frames.items():
+        for name, fn in (("records", records_path), ("columnar", columnar_path)):
+            size = len(fn(df))
+            seconds = best_of(lambda: fn(df), args.repeat)
+            print(f"{label:<10} {len(df):>9,} {name:<9} {seconds:>9.3f} {size / 1e6:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Compare the per-column statistics loops with the fused numeric_profile kernel.
+
+Run from data-backend/:
+    python -m benchmarks.bench_stats --rows 10000 --cols 500
+
+The frame is wide and numeric (every 4th column has 10% missing values, every
+5th is a small integer), which is where per-column Python overhead dominates.
+"per-column" reproduces what stats() and the null/unique counts of
+columns_info() used to do; "fused" is the current implementation.
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_codecs import best_of
+from main.functions.summary import columns_info, stats
+
+
+def make_wide_frame(rows: int, cols: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    data = {}
+    for i in range(cols):
+        if i % 5 == 0:
+            data[f"c{i}"] = rng.integers(0, 100, rows).astype(np.int16)
+            continue
+        values = rng.normal(50, 10, rows)
+        if i % 4 == 0:
+            values[rng.random(rows) < 0.1] = np.nan
+        data[f"c{i}"] = values
+    return pd.DataFrame(data)
+
+
+def per_column_stats(df: pd.DataFrame) -> list[dict]:
+    stats_list = []
+    for col in df.select_dtypes(include=[np.number]).columns:
+        stats_list.append({
+            "name": col,
+            "count": int(df[col].count()),
+            "mean": float(round(df[col].mean(), 2)),
+            "median": float(round(df[col].median(), 2)),
+            "std": float(round(df[col].std(), 2)),
+            "min": float(round(df[col].min(), 2)),
+            "max": float(round(df[col].max(), 2)),
+            "q1": float(round(df[col].quantile(0.25), 2)),
+            "q3": float(round(df[col].quantile(0.75), 2)),
+        })
+    return stats_list
+
+
+def per_column_counts(df: pd.DataFrame) -> list[dict]:
+    return [
+        {"name": col, "type": "number", "nulls": int(df[col].isna().sum()), "unique": int(df[col].nunique())}
+        for col in df.columns
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--cols", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    df = make_wide_frame(args.rows, args.cols)
+    assert per_column_stats(df) == stats(df)
+    assert per_column_counts(df) == columns_info(df)
+
+    print(f"{'function':<13} {'rows':>9} {'cols':>5} {'per-column (s)':>15} {'fused (s)':>10} {'speed-up':>9}")
+    for name, old, new in (("stats", per_column_stats, stats), ("columns_info", per_column_counts, columns_info)):
+        before = best_of(lambda: old(df), args.repeat)
+        after = best_of(lambda: new(df), args.repeat)
+        print(f"{name:<13} {args.rows:>9,} {args.cols:>5} {before:>15.3f} {after:>10.3f} {before / after:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
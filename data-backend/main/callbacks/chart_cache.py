@@ -0,0 +1,118 @@
+import hashlib
+import json
+import os
+import threading
+
+# Rendered charts are kept on disk and served as static files:
+#   static/charts/<hash>.png    hash of dataset key + generation + version + chart options
+#   static/charts/<hash>.json   how the data was sampled for it, if it was
+# A new dataset version gives new names, so a file never changes once
+# written and can be cached by browsers forever. The generation (see
+# df_manager) tells apart datasets that got the same version number after
+# Redis lost the earlier one. Files are evicted least recently used first
+# (hits refresh the mtime) once the directory grows past
+# CHART_CACHE_MAX_BYTES.
+CHART_DIR = os.getenv(
+    "CHART_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "static", "charts"),
+)
+MAX_BYTES = int(os.getenv("CHART_CACHE_MAX_BYTES", 512 * 1024 ** 2))
+
+# Bytes this process wrote since it last measured the directory; the
+# directory is only scanned again once that could take it past the limit,
+# or once it reaches SCAN_EVERY, so the other workers' writes are counted too.
+SCAN_EVERY = MAX_BYTES // 32
+
+_lock = threading.Lock()
+_measured = None   # directory size at the last scan, None before the first
+_written = 0
+
+
+def normalise(options: dict) -> dict:
+    """Chart options without unset values, so equivalent requests share a file."""
+    return {k: v for k, v in sorted(options.items()) if not (v is None or v is False or v == [] or v == "")}
+
+
+def chart_name(key: str, manifest: dict, options: dict) -> str:
+    spec = json.dumps({
+        "key": key,
+        "generation": manifest.get("generation"),
+        "version": manifest["version"],
+        "options": normalise(options),
+    }, sort_keys=True)
+    return hashlib.sha256(spec.encode()).hexdigest()[:32]
+
+
+def chart_path(name: str) -> str:
+    return os.path.join(CHART_DIR, f"{name}.png")
+
+
+def sampling_path(name: str) -> str:
+    return os.path.join(CHART_DIR, f"{name}.json")
+
+
+def lookup(name: str) -> bool:
+    """True if the chart is cached; marks it as recently used."""
+    try:
+        os.utime(chart_path(name))
+        return True
+    except FileNotFoundError:
+        return False
+
+
+def _write(path: str, content: bytes):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(content)
+    os.replace(tmp, path)  # readers never see a partial file
+
+
+def store(name: str, png: bytes, sampling: dict = None):
+    os.makedirs(CHART_DIR, exist_ok=True)
+    # the sampling note goes first, so a visible chart always has it
+    global _written
+    if sampling is not None:
+        _write(sampling_path(name), json.dumps(sampling).encode())
+    _write(chart_path(name), png)
+    with _lock:
+        _written += len(png)
+        due = _measured is None or _measured + _written > MAX_BYTES or _written >= SCAN_EVERY
+    if due:
+        evict()
+
+
+def get_sampling(name: str):
+    """How the chart's data was sampled (see functions.sampling), or None
+    if every row was drawn."""
+    try:
+        with open(sampling_path(name)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def evict(max_bytes: int = MAX_BYTES):
+    """Delete the least recently used charts until the directory fits."""
+    global _measured, _written
+    with _lock:
+        entries = []
+        for entry in os.scandir(CHART_DIR):
+            if entry.name.endswith(".png"):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        entries.sort()
+        # the most recent file always stays
+        for _, size, path in entries[:-1]:
+            if total <= max_bytes:
+                break
+            for stale in (path, path[:-len(".png")] + ".json"):
+                try:
+                    os.remove(stale)
+                except FileNotFoundError:
+                    pass
+            total -= size
+        _measured, _written = total, 0
@@ -0,0 +1,146 @@
+import asyncio
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from main.utils.errors import AppException
+
+# Charts are rendered in a pool of worker processes so a slow matplotlib
+# render never blocks the event loop (HTTP requests, socket.io streaming).
+# Workers import matplotlib/seaborn and apply the style once at startup, and
+# read the dataset through their own df_manager cache, so only the dataset
+# key and the chart arguments cross the process boundary: columns come from
+# the host's shared memory (or Redis) and stay cached between renders.
+# Other heavy jobs (Kendall correlation) go through the same queue limit and
+# timeout, see run_in_pool.
+POOL_SIZE = int(os.getenv("CHART_WORKERS", max(1, (os.cpu_count() or 2) // 2)))
+QUEUE_DEPTH = int(os.getenv("CHART_QUEUE_DEPTH", 8))    # waiting renders beyond the busy workers
+RENDER_TIMEOUT = float(os.getenv("CHART_TIMEOUT", 60))  # seconds
+POLL_INTERVAL = 0.25
+
+_executor = None
+_pending = 0
+
+
+def _init_worker():
+    import pandas as pd
+    pd.set_option("mode.copy_on_write", True)  # as in the app process, see main.py
+    import matplotlib
+    matplotlib.use("Agg")
+    from main.functions.charts import use_style
+    use_style()
+
+
+def _warm():
+    return os.getpid()
+
+
+def _render(key: str, options: dict, name: str = None):
+    from main.callbacks.df_manager import get_df
+    from main.functions.charts import plot_chart, plot_facets
+    from main.functions.sampling import downsample
+    options = dict(options)
+    panels = options.pop("panels", None)
+    if options.get("chart") == "heatmap":
+        # drawn from the cached correlation matrix (every numeric column
+        # unless `cols` lists them), the dataset itself is not needed
+        import pandas as pd
+        from main.callbacks.correlation import get_correlation
+        cols = options.get("cols")
+        corr = get_correlation(key, "pearson", cols if isinstance(cols, list) else None)
+        matrix = pd.DataFrame(corr["matrix"], index=corr["columns"], columns=corr["columns"])
+        options.pop("max_points", None)
+        return _finish(name, lambda **kwargs: plot_chart(data=matrix, **options, corr=matrix, **kwargs), None)
+
+    df = get_df(key)
+    if df is None:
+        raise AppException("No DataFrame found", status_code=404)
+    if panels is None:
+        df, sampling = downsample(df, **options)
+        options.pop("max_points", None)
+        draw = lambda **kwargs: plot_chart(data=df, **options, **kwargs)
+    else:
+        # one faceted figure, each panel sampled on its own columns
+        drawn = [(x, y, *downsample(df, **options, x=x, y=y)) for x, y in panels]
+        sampling = [s for *_, s in drawn]
+        options.pop("max_points", None)
+        draw = lambda **kwargs: plot_facets([(frame, x, y) for x, y, frame, _ in drawn], **options, **kwargs)
+    return _finish(name, draw, sampling)
+
+
+def _finish(name, draw, sampling):
+    if name is None:
+        return draw(), sampling
+    # written to the chart cache here, so the PNG never crosses processes
+    from main.callbacks import chart_cache
+    chart_cache.store(name, draw(as_bytes=True), sampling)
+    return name, sampling
+
+
+def get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=POOL_SIZE,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+        )
+    return _executor
+
+
+def start_pool():
+    """Start every worker now, so the first charts do not pay for the
+    interpreter and matplotlib start-up."""
+    executor = get_executor()
+    for _ in range(POOL_SIZE):
+        executor.submit(_warm)
+
+
+def shutdown_pool():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+async def run_in_pool(fn, *args, request=None, timeout: float = RENDER_TIMEOUT, what: str = "Chart rendering"):
+    """
+    `fn(*args)` in the pool, awaited without blocking the event loop.
+
+    Refused with 503 when POOL_SIZE + QUEUE_DEPTH jobs are already in
+    flight. A job that is still queued when the client (`request`)
+    disconnects, `timeout` seconds pass or the caller is cancelled is dropped; one that already
+    started runs to completion in its worker, but nobody waits for it.
+    """
+    global _pending
+    if _pending >= POOL_SIZE + QUEUE_DEPTH:
+        raise AppException("The chart workers are busy, try again shortly", status_code=503)
+
+    _pending += 1
+    future = get_executor().submit(fn, *args)
+    waiter = asyncio.wrap_future(future)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    try:
+        while True:
+            done, _ = await asyncio.wait({waiter}, timeout=POLL_INTERVAL)
+            if done:
+                return waiter.result()
+            if request is not None and await request.is_disconnected():
+                raise AppException("Client disconnected", status_code=499)
+            if loop.time() > deadline:
+                raise AppException(f"{what} timed out", status_code=504)
+    finally:
+        future.cancel()
+        _pending -= 1
+
+
+async def render_chart(key: str, options: dict, request=None, name: str = None, timeout: float = RENDER_TIMEOUT):
+    """
+    Render `plot_chart(get_df(key), **options)` in the pool (see
+    run_in_pool), thinned to the chart's point budget first (see
+    functions.sampling); with a list of (x, y) `panels` in the options,
+    `plot_facets` draws them as one figure. Returns (chart, sampling); with
+    `name`, the PNG is stored in the chart cache under that name and the
+    chart returned is the name.
+    """
+    return await run_in_pool(_render, key, options, name, request=request, timeout=timeout)
@@ -0,0 +1,122 @@
+import asyncio
+import os
+import uuid
+from fastapi.concurrency import run_in_threadpool
+from main.redis_utils.pubsub import r
+from main.sockets.events import sio
+from main.utils.errors import AppException
+
+# Progressive chart delivery: /chart/plot-chart answers with a quick, low-dpi
+# preview (fewer points too), while the full-resolution chart renders in the
+# background and is pushed to the client's socket.io connection:
+#   "chart"         {"render_id", "data", "message"}
+#   "chart_error"   {"render_id", "success": False, "error", "details"}
+# A client has at most one background render: a new chart request from the
+# same socket cancels the previous one (still queued renders are dropped, a
+# render already running in a worker finishes there unused).
+#
+# Sockets and their latest render are registered in Redis, since the HTTP
+# request, the socket and an earlier render may each be on another uvicorn
+# worker:
+#   socket:{sid}        dataset session of the socket ("" for none)
+#   chart_push:{sid}    render id of the push the socket is waiting for
+# A push whose render id is no longer the latest (or whose socket is gone) is
+# dropped, and only requests of the socket's own session may push to it.
+PREVIEW_DPI = int(os.getenv("CHART_PREVIEW_DPI", 60))
+PREVIEW_POINTS = int(os.getenv("CHART_PREVIEW_POINTS", 2000))
+PREVIEW_TIMEOUT = float(os.getenv("CHART_PREVIEW_TIMEOUT", 3))  # seconds
+SOCKET_TTL = 24 * 3600  # seconds, in case a disconnect is never seen
+
+_pushes = {}   # sid -> task of the pushes started by this worker
+
+
+def _socket_key(sid: str) -> str:
+    return f"socket:{sid}"
+
+
+def _push_key(sid: str) -> str:
+    return f"chart_push:{sid}"
+
+
+def register_socket(sid: str, session: str = None):
+    r.set(_socket_key(sid), session or "", ex=SOCKET_TTL)
+
+
+def forget_socket(sid: str):
+    r.delete(_socket_key(sid), _push_key(sid))
+
+
+def owns_socket(sid: str, session: str = None) -> bool:
+    """True if `sid` is a connected socket of the dataset session `session`
+    (None for requests without X-Session-Id)."""
+    owner = r.get(_socket_key(sid))
+    return owner is not None and owner.decode() == (session or "")
+
+
+def _is_latest(sid: str, render_id: str) -> bool:
+    latest = r.get(_push_key(sid))
+    return latest is not None and latest.decode() == render_id
+
+
+def preview_options(options: dict) -> dict:
+    from main.functions.sampling import POINT_BUDGETS
+    budget = options.get("max_points") or POINT_BUDGETS.get(options["chart"])
+    preview = {**options, "dpi": PREVIEW_DPI}
+    if budget is not None:
+        preview["max_points"] = min(budget, PREVIEW_POINTS)
+    return preview
+
+
+def _cancel_local(sid: str):
+    task = _pushes.pop(sid, None)
+    if task is not None:
+        task.cancel()
+
+
+async def cancel_push(sid: str):
+    """Drop the push pending for `sid`, whichever worker started it."""
+    _cancel_local(sid)
+    await run_in_threadpool(r.delete, _push_key(sid))
+
+
+async def start_push(sid: str, render) -> str:
+    """
+    Await `render()` (returning (data, message)) in the background and emit
+    the result to `sid`, replacing any push still pending for it. Returns the
+    render id sent along, so the client can match the push to its request.
+    The caller checks that the request may push to `sid` (see owns_socket).
+    """
+    _cancel_local(sid)
+    render_id = uuid.uuid4().hex
+    await run_in_threadpool(r.set, _push_key(sid), render_id, ex=SOCKET_TTL)
+
+    async def emit(event: str, payload: dict):
+        # a later request (maybe on another worker) or a disconnect supersedes it
+        if await run_in_threadpool(_is_latest, sid, render_id):
+            await sio.emit(event, {"render_id": render_id, **payload}, to=sid)
+
+    async def run():
+        try:
+            data, message = await render()
+            await emit("chart", {"data": data, "message": message})
+        except AppException as ae:
+            await emit("chart_error", {
+                "success": False,
+                "error": ae.message,
+                "details": ae.extra
+            })
+        except ValueError as e:
+            await emit("chart_error", {"success": False, "error": str(e)})
+        except Exception as e:
+            await emit("chart_error", {
+                "success": False,
+                "error": "Internal Server Error"
+            })
+            print(f"[ERROR] Chart push failed: {e}")
+        finally:
+            if _pushes.get(sid) is task:
+                del _pushes[sid]
+
+    task = asyncio.create_task(run())
+    _pushes[sid] = task
+    return render_id
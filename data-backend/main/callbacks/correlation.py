@@ -0,0 +1,135 @@
+import asyncio
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from fastapi.concurrency import run_in_threadpool
+from main.callbacks.df_manager import get_columns, get_manifest, get_version, numeric_columns
+from main.callbacks.memo import memoize, peek
+from main.functions.correlation import (
+    METHODS, as_matrix, pearson, ranks, spearman, kendall_pairs, upper_pairs, from_pairs,
+)
+from main.utils.errors import AppException
+
+# Correlation matrices, computed once per dataset version, method and column
+# set (memoised in Redis like the summaries, see memo.py). Spearman works
+# from per-column ranks, which are kept per column version, so after a write
+# to one column only that column is ranked again. Kendall (O(n log n) per
+# pair) is split into chunks of pairs computed in parallel by the chart
+# workers, under the pool's queue limit and timeout (see
+# chart_pool.run_in_pool); each worker reads the columns from shared memory
+# itself.
+MAX_RANKS = 64
+PAIRS_PER_JOB = 16
+_ranks = OrderedDict()   # (key, generation, column, column version, index version) -> ranks
+_lock = threading.Lock()
+
+
+def _ranked(key: str, manifest: dict, df: pd.DataFrame) -> np.ndarray:
+    ranked = []
+    for c in df.columns:
+        cache_key = (key, manifest.get("generation"), c, manifest["col_versions"][c], manifest["index_version"])
+        with _lock:
+            cached = _ranks.get(cache_key)
+            if cached is not None:
+                _ranks.move_to_end(cache_key)
+        if cached is None:
+            cached = ranks(df[c])
+            with _lock:
+                _ranks[cache_key] = cached
+                while len(_ranks) > MAX_RANKS:
+                    _ranks.popitem(last=False)
+        ranked.append(cached)
+    return np.column_stack(ranked) if ranked else np.empty((len(df), 0))
+
+
+def _kendall(df: pd.DataFrame) -> np.ndarray:
+    pairs = upper_pairs(len(df.columns))
+    return from_pairs(len(df.columns), pairs, kendall_pairs(as_matrix(df), pairs), 1.0)
+
+
+def kendall_chunk(key: str, columns: list, pairs: list) -> list:
+    """Kendall's tau for `pairs` (positions in `columns`), run in a pool
+    worker; only the columns the pairs use are read."""
+    used = sorted({i for pair in pairs for i in pair})
+    df = get_columns([columns[i] for i in used], key=key)
+    if df is None:
+        raise AppException("No DataFrame found", status_code=404)
+    position = {i: n for n, i in enumerate(used)}
+    return kendall_pairs(as_matrix(df), [(position[i], position[j]) for i, j in pairs])
+
+
+def _columns(key: str, method: str, columns: list = None):
+    """(manifest, columns) after checking the request."""
+    if method not in METHODS:
+        raise AppException(f"Invalid method. Choose from: {', '.join(METHODS)}.")
+    manifest = get_manifest(key)
+    if manifest is None:
+        raise AppException("No DataFrame found", status_code=404)
+
+    numeric = numeric_columns(manifest)
+    columns = list(dict.fromkeys(columns)) if columns else numeric
+    for c in columns:
+        if c not in manifest["columns"]:
+            raise AppException(f"Column '{c}' not found in DataFrame.")
+        if c not in numeric:
+            raise AppException(f"Column '{c}' is not numeric.")
+    return manifest, columns
+
+
+def get_correlation(key: str = "main_df", method: str = "pearson", columns: list = None) -> dict:
+    """
+    {"method", "columns", "matrix": [[...]]} for `columns` (default: every
+    numeric column), NaN where a pair has too few complete rows or a
+    column is constant.
+    """
+    manifest, columns = _columns(key, method, columns)
+
+    def compute():
+        df = get_columns(columns, key=key)
+        if method == "pearson":
+            matrix = pearson(as_matrix(df))
+        elif method == "spearman":
+            matrix = spearman(_ranked(key, manifest, df))
+        else:
+            matrix = _kendall(df)
+        return {"method": method, "columns": columns, "matrix": matrix.tolist()}
+
+    return memoize(key, "correlation", compute, method, columns)
+
+
+async def correlation_for(request, key: str = "main_df", method: str = "pearson", columns: list = None) -> dict:
+    """get_correlation for a request, off the event loop. A Kendall matrix
+    that is not cached yet is computed in the chart worker pool, in chunks
+    of PAIRS_PER_JOB pairs with at most POOL_SIZE of them in flight; like a
+    chart render it is refused (503), timed out (504) or dropped when the
+    client leaves (499) instead of tying up a request thread."""
+    if method != "kendall":
+        return await run_in_threadpool(get_correlation, key, method, columns)
+    from main.callbacks.chart_pool import POOL_SIZE, run_in_pool
+    manifest, columns = await run_in_threadpool(_columns, key, method, columns)
+    hit, corr = await run_in_threadpool(peek, key, "correlation", method, columns)
+    if hit:
+        return corr
+
+    pairs = upper_pairs(len(columns))
+    slots = asyncio.Semaphore(POOL_SIZE)
+
+    async def run(chunk):
+        async with slots:
+            return await run_in_pool(kendall_chunk, key, columns, chunk, request=request, what="Correlation")
+
+    jobs = [asyncio.ensure_future(run(pairs[i:i + PAIRS_PER_JOB])) for i in range(0, len(pairs), PAIRS_PER_JOB)]
+    try:
+        taus = [tau for chunk in await asyncio.gather(*jobs) for tau in chunk]
+    finally:
+        for job in jobs:  # one chunk failed: drop the others
+            job.cancel()
+    # every chunk read the version the request started from, or it moved on
+    if await run_in_threadpool(get_version, key) != manifest["version"]:
+        raise AppException("Dataset kept changing while being read, try again", status_code=503)
+
+    matrix = from_pairs(len(columns), pairs, taus, 1.0)
+    corr = {"method": method, "columns": columns, "matrix": matrix.tolist()}
+    return await run_in_threadpool(memoize, key, "correlation", lambda: corr, method, columns)
@@ -0,0 +1,83 @@
+import os
+import threading
+from collections import OrderedDict
+
+# Budget for datasets held in memory by one worker. Evicted datasets stay in
+# Redis and are simply loaded again on the next read.
+DEFAULT_MAX_BYTES = int(os.getenv("DF_CACHE_MAX_BYTES", 2 * 1024 ** 3))
+
+
+class DatasetCache:
+    """Byte-size-aware LRU of per-worker dataset entries.
+
+    Entries must expose an `nbytes` attribute. The most recently used entry
+    is never evicted, so a single dataset larger than the budget still works.
+    `on_evict(key, entry)` is called (outside the lock) for every entry
+    evicted to make room.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, on_evict=None):
+        self.max_bytes = max_bytes
+        self.on_evict = on_evict
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: str, entry):
+        size = entry.nbytes
+        evicted = []
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.bytes -= previous.nbytes
+            self._entries[key] = entry
+            self.bytes += size
+            while self.bytes > self.max_bytes and len(self._entries) > 1:
+                old_key, old = self._entries.popitem(last=False)
+                self.bytes -= old.nbytes
+                self.evictions += 1
+                evicted.append((old_key, old))
+        if self.on_evict is not None:
+            for old_key, old in evicted:
+                self.on_evict(old_key, old)
+
+    def pop(self, key: str, default=None):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return default
+            self.bytes -= entry.nbytes
+            return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def record(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "datasets": list(self._entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
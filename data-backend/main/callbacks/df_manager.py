@@ -1,45 +1,447 @@
-import pickle
+import re
+import json
+import uuid
 import redis
+import numpy as np
 import pandas as pd
-from main.redis_utils.pubsub import notify_update, r
+from contextlib import contextmanager
+from typing import Optional
+from fastapi import Depends, Header
+from main.redis_utils.pubsub import notify_update, parse_update, r
+from main.redis_utils.codecs import encode_df, decode_df
+from main.callbacks import shared_store
+from main.callbacks.dataset_cache import DatasetCache
 from main.utils.errors import AppException
 
-# local in-memory cache (per worker)
-_cache = {}
+# Redis layout for a dataset stored under `key`:
+#   {key}:version       monotonically increasing version counter
+#   {key}:manifest      JSON: version, rows, columns, dtypes, col_versions, index_version,
+#                       generation
+#   {key}:index         the row index encoded as an empty frame (unless it is
+#                       a RangeIndex, which the manifest describes directly)
+#   {key}:col:{name}    one encoded single-column frame per column
+# A write bumps the version of the columns it touched only, so readers can
+# tell which of their cached columns are still current. Versions start again
+# at 1 if Redis loses the dataset, so the manifest also carries a generation
+# nonce, set when it is created, that host-local copies are keyed by too.
+#
+# Column data itself is also materialised once per host in shared memory
+# (see shared_store) and memory-mapped by every worker on that host.
+#
+# Cached frames are never modified. Readers share them: with pandas'
+# copy-on-write mode (enabled at startup, see main.py) any change a caller
+# makes to the frame it was handed stays private to that caller. Writers go
+# through `transaction()`, which works on such a snapshot (a real copy when
+# copy-on-write is off) and commits it as a new version; the cache entry is
+# swapped in one step, so readers keep whichever snapshot they already hold.
 
-def get_df(key: str = "main_df"):
+
+def version_key(key: str) -> str:
+    return f"{key}:version"
+
+
+def manifest_key(key: str) -> str:
+    return f"{key}:manifest"
+
+
+def index_key(key: str) -> str:
+    return f"{key}:index"
+
+
+def column_key(key: str, column: str) -> str:
+    return f"{key}:col:{column}"
+
+
+class _Entry:
+    """Columns of one dataset held by this worker, all from the same manifest."""
+
+    def __init__(self, manifest: dict, index: pd.Index, columns: dict, sizes: dict, index_bytes: int = None):
+        self.manifest = manifest
+        self.index = index
+        self.columns = columns
+        # bytes each column costs this worker, measured when it was decoded
+        self.sizes = {c: sizes[c] for c in columns}
+        held = [c for c in manifest["columns"] if c in columns]
+        # Assembling from the cached arrays does not copy them
+        self._frame = pd.DataFrame({c: columns[c] for c in held}, index=index, copy=False)
+        self.index_bytes = int(index.memory_usage(deep=True)) if index_bytes is None else index_bytes
+        self.nbytes = self.index_bytes + sum(self.sizes[c] for c in held)
+
+    @property
+    def version(self) -> int:
+        return self.manifest["version"]
+
+    def is_current(self, column: str, manifest: dict) -> bool:
+        return (
+            column in self.columns
+            and self.manifest.get("generation") == manifest.get("generation")
+            and self.manifest["index_version"] == manifest["index_version"]
+            and self.manifest["col_versions"].get(column) == manifest["col_versions"].get(column)
+        )
+
+    def has(self, columns) -> bool:
+        return all(c in self.columns for c in columns)
+
+    def frame(self, columns=None) -> pd.DataFrame:
+        """A snapshot for one caller: a lazy copy, so it is O(columns) to hand
+        out and only the columns the caller writes to are ever copied."""
+        if columns is None:
+            return self._frame.copy(deep=False)
+        return self._frame[list(columns)]
+
+
+def _evicted(key: str, entry: _Entry):
+    # Drop the host copy too, so idle datasets do not pile up in /dev/shm.
+    # Workers still mapping it keep their pages; the next reader rewrites it.
+    shared_store.clear(key)
+
+
+# local in-memory cache (per worker): key -> _Entry, bounded by DF_CACHE_MAX_BYTES
+_cache = DatasetCache(on_evict=_evicted)
+
+_NAME = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+def dataset_key(dataset: str = "main_df", x_session_id: Optional[str] = Header(None)) -> str:
+    """Redis key of the dataset a request works on. Requests with an
+    X-Session-Id header get their own namespace, the others share `main_df`."""
+    for name in (dataset, x_session_id):
+        if name is not None and not _NAME.match(name):
+            raise AppException("Invalid dataset or session name", status_code=400)
+    return dataset if x_session_id is None else f"session:{x_session_id}:{dataset}"
+
+
+def get_version(key: str = "main_df") -> int:
+    """Current version of a stored dataset (0 if it was never written)."""
     try:
-        if key in _cache:
-            return _cache[key]
-        pickled_df = r.get(key)
-        if pickled_df is None:
+        version = r.get(version_key(key))
+        return int(version) if version else 0
+    except redis.exceptions.ConnectionError as e:
+        raise AppException("Failed to connect to Redis", extra=str(e), status_code=503)
+
+
+def get_manifest(key: str = "main_df"):
+    """Schema of the stored dataset without fetching any column data."""
+    entry = _cache.get(key)
+    if entry is not None and entry.version == get_version(key):
+        return entry.manifest
+    try:
+        raw = r.get(manifest_key(key))
+    except redis.exceptions.ConnectionError as e:
+        raise AppException("Failed to connect to Redis", extra=str(e), status_code=503)
+    return json.loads(raw) if raw else None
+
+
+def _decode_column(payload, column: str):
+    return decode_df(payload)[column].array
+
+
+def _encode_column(df: pd.DataFrame, column: str) -> bytes:
+    return encode_df(pd.DataFrame({column: df[column].array}, copy=False))
+
+
+def _column_bytes(values, mapped: bool) -> int:
+    """What holding a column costs this worker. A numeric column mapped
+    zero-copy (read-only pages of the shared file) costs nothing; anything
+    else, e.g. strings Arrow decoded into Python objects, its deep size."""
+    if mapped and isinstance(values, pd.arrays.NumpyExtensionArray):
+        data = np.asarray(values)
+        if data.dtype.kind in "fiuc" and not data.flags.writeable:
+            return 0
+    return int(pd.Series(values, copy=False).memory_usage(index=False, deep=True))
+
+
+def _shared(key: str, manifest: dict, column: str, values):
+    """Publish a column version to host shared memory and use the mapped copy,
+    so this worker does not keep a private one. Returns (values, size), the
+    size measured once here (see _column_bytes)."""
+    col_version, generation = manifest["col_versions"][column], manifest.get("generation", "")
+    if shared_store.write_column(key, column, col_version, generation, values):
+        mapped = shared_store.read_column(key, column, col_version, generation)
+        if mapped is not None:
+            return mapped, _column_bytes(mapped, True)
+    return values, _column_bytes(values, False)
+
+
+def _encode_index(index: pd.Index):
+    """Return (manifest description, payload); a RangeIndex needs no payload."""
+    if isinstance(index, pd.RangeIndex):
+        return {"start": index.start, "stop": index.stop, "step": index.step}, None
+    return None, encode_df(pd.DataFrame(index=index))
+
+
+def _decode_index(manifest: dict, payload) -> pd.Index:
+    if manifest.get("range_index"):
+        return pd.RangeIndex(**manifest["range_index"])
+    return decode_df(payload).index
+
+
+def _load(key: str, columns=None, retries: int = 3):
+    """Bring `columns` (default: all) of `key` up to date in the local cache,
+    fetching only the ones whose column version changed."""
+    for _ in range(retries):
+        raw = r.get(manifest_key(key))
+        if raw is None:
+            _cache.pop(key, None)
+            shared_store.clear(key)  # the dataset is gone
             return None
-        df = pickle.loads(pickled_df)
-        _cache[key] = df
-        return df
+        manifest = json.loads(raw)
+        wanted = manifest["columns"] if columns is None else list(columns)
+        missing = [c for c in wanted if c not in manifest["col_versions"]]
+        if missing:
+            raise AppException(f"Column(s) not found: {', '.join(missing)}", status_code=404)
+
+        old = _cache.get(key)
+        reuse = {} if old is None else {
+            c: arr for c, arr in old.columns.items()
+            if c in manifest["col_versions"] and old.is_current(c, manifest)
+        }
+        stale = [c for c in wanted if c not in reuse]
+        # Another worker on this host may already have mapped them
+        mapped = {}
+        for c in stale:
+            values = shared_store.read_column(key, c, manifest["col_versions"][c], manifest.get("generation", ""))
+            if values is not None:
+                mapped[c] = values
+        stale = [c for c in stale if c not in mapped]
+        sizes = {c: _column_bytes(values, True) for c, values in mapped.items()}
+        need_index = old is None or old.manifest["index_version"] != manifest["index_version"]
+
+        # Version + payloads in one transaction; if the version moved since
+        # we read the manifest, a writer got in between and we start over.
+        pipe = r.pipeline()
+        pipe.get(version_key(key))
+        for c in stale:
+            pipe.get(column_key(key, c))
+        if need_index:
+            pipe.get(index_key(key))
+        results = pipe.execute()
+        if int(results[0] or 0) != manifest["version"]:
+            continue
+
+        index = _decode_index(manifest, results[-1]) if need_index else old.index
+        fetched = {
+            c: _shared(key, manifest, c, _decode_column(payload, c))
+            for c, payload in zip(stale, results[1:])
+        }
+        sizes.update({c: size for c, (_, size) in fetched.items()})
+        sizes.update({c: old.sizes[c] for c in reuse})
+        columns_now = {**reuse, **mapped, **{c: values for c, (values, _) in fetched.items()}}
+        entry = _Entry(manifest, index, columns_now, sizes, None if need_index else old.index_bytes)
+        _cache.put(key, entry)
+        return entry
+    raise AppException("Dataset kept changing while being read, try again", status_code=503)
+
+
+def _entry(key: str, columns=None):
+    cached = _cache.get(key)
+    wanted = None if cached is None else (cached.manifest["columns"] if columns is None else columns)
+    # One cheap GET tells us whether an update was missed
+    if cached is not None and cached.has(wanted) and cached.version == get_version(key):
+        _cache.record(hit=True)
+        return cached
+    _cache.record(hit=False)
+    return _load(key, columns)
+
+
+def get_df(key: str = "main_df"):
+    try:
+        entry = _entry(key)
+        return None if entry is None else entry.frame()
+    except AppException:
+        raise
     except redis.exceptions.ConnectionError as e:
         raise AppException("Failed to connect to Redis", extra=str(e), status_code=503)
     except Exception as e:
         raise AppException("Failed to get DataFrame", extra=str(e), status_code=500)
 
-def set_df(df: pd.DataFrame, key: str = "main_df", channel: str = "df_update"):
 
+def get_columns(columns, key: str = "main_df"):
+    """Fetch only `columns` of the dataset (in the given order)."""
     try:
-        _cache[key] = df
-        r.set(key, pickle.dumps(df))
-        notify_update(channel)
+        entry = _entry(key, columns)
+        return None if entry is None else entry.frame(list(columns))
+    except AppException:
+        raise
+    except redis.exceptions.ConnectionError as e:
+        raise AppException("Failed to connect to Redis", extra=str(e), status_code=503)
+    except Exception as e:
+        raise AppException("Failed to get DataFrame", extra=str(e), status_code=500)
+
+
+def numeric_columns(manifest: dict) -> list:
+    """The numeric (non-bool) columns of a manifest, from its dtypes alone."""
+    dtypes = {c: pd.api.types.pandas_dtype(manifest["dtypes"][c]) for c in manifest["columns"]}
+    return [
+        c for c, dtype in dtypes.items()
+        if pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)
+    ]
+
+
+def current_df(key: str = Depends(dataset_key)):
+    """Route dependency: the whole dataset of the current namespace."""
+    df = get_df(key)
+    if df is None:
+        raise AppException("No DataFrame found", status_code=404)
+    return df
+
+
+def cache_stats() -> dict:
+    return _cache.stats()
+
 
+def set_df(df: pd.DataFrame, key: str = "main_df", channel: str = "df_update", columns=None,
+           expected_version: int = None):
+    """Store `df` under `key` and notify the other workers.
+
+    With `columns`, only those columns of `df` are written (the row index
+    must be unchanged); every other stored column is left as it is.
+    With `expected_version`, the write is refused if the dataset moved on
+    since that version was read."""
+
+    try:
+        written = list(df.columns) if columns is None else list(columns)
+        payloads = {c: _encode_column(df, c) for c in written}
+        full = columns is None
+        range_index, index_payload = _encode_index(df.index) if full else (None, None)
+
+        def write(pipe):
+            raw = pipe.get(manifest_key(key))
+            old = json.loads(raw) if raw else None
+            if not full and (old is None or old["rows"] != len(df)):
+                raise AppException("Column update does not match the stored dataset", status_code=409)
+            current = int(pipe.get(version_key(key)) or 0)
+            if expected_version is not None and current != expected_version:
+                raise AppException("Dataset was changed by another request, try again", status_code=409)
+            version = current + 1
+
+            if not full:
+                manifest = {**old, "columns": list(old["columns"]), "dtypes": dict(old["dtypes"]),
+                            "col_versions": dict(old["col_versions"])}
+                manifest["columns"] += [c for c in written if c not in old["col_versions"]]
+            else:
+                manifest = {"rows": len(df), "columns": written, "dtypes": {}, "col_versions": {},
+                            "index_version": version, "range_index": range_index}
+            manifest["version"] = version
+            manifest["generation"] = (old or {}).get("generation") or uuid.uuid4().hex
+            for c in written:
+                manifest["dtypes"][c] = str(df[c].dtype)
+                manifest["col_versions"][c] = version
+
+            pipe.multi()
+            if full:
+                if index_payload is None:
+                    pipe.delete(index_key(key))
+                else:
+                    pipe.set(index_key(key), index_payload)
+                dropped = [] if old is None else [c for c in old["columns"] if c not in manifest["col_versions"]]
+                for c in dropped:
+                    pipe.delete(column_key(key, c))
+            for c, payload in payloads.items():
+                pipe.set(column_key(key, c), payload)
+            pipe.set(manifest_key(key), json.dumps(manifest))
+            pipe.set(version_key(key), version)
+            return manifest, old is None
+
+        manifest, created = r.transaction(write, manifest_key(key), version_key(key), value_from_callable=True)
+
+        if created:
+            # files left from an earlier generation of this key are never current
+            shared_store.clear(key)
+        # Materialise the new columns for this host before anyone is told,
+        # and keep our own copy current without a round trip
+        published = {c: _shared(key, manifest, c, df[c].array) for c in written}
+        arrays = {c: values for c, (values, _) in published.items()}
+        sizes = {c: size for c, (_, size) in published.items()}
+        shared_store.prune(key, manifest)
+        old = _cache.get(key)
+        if full:
+            _cache.put(key, _Entry(manifest, df.index, arrays, sizes))
+        elif old is not None and old.version == manifest["version"] - 1 \
+                and old.manifest.get("generation") == manifest.get("generation"):
+            columns_now = {c: a for c, a in old.columns.items() if c not in written}
+            columns_now.update(arrays)
+            sizes.update({c: old.sizes[c] for c in columns_now if c not in sizes})
+            _cache.put(key, _Entry(manifest, old.index, columns_now, sizes, old.index_bytes))
+        else:
+            _cache.pop(key, None)
+
+        notify_update(channel, key=key, version=manifest["version"],
+                      columns=None if columns is None else written, generation=manifest["generation"])
+        return manifest["version"]
+
+    except AppException:
+        raise
     except redis.exceptions.ConnectionError as e:
         raise AppException("Failed to connect to Redis", extra=str(e), status_code=503)
     except Exception as e:
         raise AppException("Failed to set DataFrame", extra=str(e), status_code=500)
 
-def refresh_df(key: str = "main_df"):
-    """Force reload from Redis (for Pub/Sub events)"""
+
+class Transaction:
+    """A private snapshot of a dataset (or of some of its columns) to mutate."""
+
+    def __init__(self, key: str, columns=None):
+        self.key = key
+        self.columns = None if columns is None else list(columns)
+        entry = _entry(key, self.columns)
+        if entry is None:
+            raise AppException("No DataFrame found", status_code=404)
+        self.version = entry.version
+        # Holding the entry keeps the snapshot's source alive, so in-place
+        # edits are copied out of the (possibly read-only, shared) arrays
+        self._entry = entry
+        self.df = entry.frame(self.columns)
+        if not pd.get_option("mode.copy_on_write"):
+            self.df = self.df.copy()  # in-place edits would reach the cached arrays
+
+    def commit(self, channel: str = "df_update") -> int:
+        return set_df(self.df, key=self.key, channel=channel, columns=self.columns,
+                      expected_version=self.version)
+
+
+@contextmanager
+def transaction(key: str = "main_df", columns=None, channel: str = "df_update"):
+    """Mutate `tx.df` (or assign a new frame to it) inside the block; on exit
+    it is committed as the next version. Nothing is written if the block
+    raises, and concurrent readers never see the intermediate state.
+
+        with transaction(key, columns=["Age"]) as tx:
+            tx.df["Age"] = tx.df["Age"].fillna(0)
+    """
+    try:
+        tx = Transaction(key, columns)
+    except AppException:
+        raise
+    except redis.exceptions.ConnectionError as e:
+        raise AppException("Failed to connect to Redis", extra=str(e), status_code=503)
+    yield tx
+    tx.commit(channel)
+
+
+def refresh_df(message=None):
+    """Apply a Pub/Sub update: refresh only the published key, only if this
+    worker has not already seen that version, and only the changed columns
+    it actually holds."""
     try:
-        pickled_df = r.get(key)
-        if pickled_df:
-            _cache[key] = pickle.loads(pickled_df)
+        update = parse_update(message)
+        if update is None:
+            # Unversioned message: drop everything, get_df revalidates lazily
+            _cache.clear()
+            return
+        cached = _cache.get(update["key"])
+        if cached is None:
+            return
+        generation = update.get("generation")
+        if generation is not None and cached.manifest.get("generation") != generation:
+            _cache.pop(update["key"], None)  # a new dataset under the same key
+            return
+        if cached.version >= update["version"]:
+            return
+        changed = update.get("columns")
+        if changed is not None and not any(c in cached.columns for c in changed):
+            return  # nothing we hold changed; the next read only fetches the manifest
+        _load(update["key"], list(cached.columns))
     except redis.exceptions.ConnectionError as e:
         raise AppException("Failed to connect to Redis", extra=str(e), status_code=503)
     except Exception as e:
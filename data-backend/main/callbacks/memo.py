@@ -0,0 +1,145 @@
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from main.redis_utils.pubsub import parse_update, r
+from main.callbacks.df_manager import get_version
+
+# Results of summary computations, per dataset version and arguments:
+#   {key}:memo:{version}            hash, field = JSON [name, *args] -> JSON result
+#   {key}:memo:{version}:lock:{f}   single-flight lock while one worker computes f
+# A new version never reuses an old hash, so nothing is ever served stale;
+# old hashes are deleted on df_update and expire after MEMO_TTL anyway.
+MEMO_TTL = int(os.getenv("DF_MEMO_TTL", 3600))
+LOCK_TTL_MS = 60_000
+WAIT_STEP = 0.05
+MAX_LOCAL = 256
+
+_local = OrderedDict()   # (key, version, field) -> result
+_flights = {}            # (key, version, field) -> threading.Lock
+_lock = threading.Lock()
+
+
+def memo_key(key: str, version: int) -> str:
+    return f"{key}:memo:{version}"
+
+
+def _remember(slot, result):
+    with _lock:
+        _local[slot] = result
+        _local.move_to_end(slot)
+        while len(_local) > MAX_LOCAL:
+            _local.popitem(last=False)
+
+
+def _cached(slot):
+    with _lock:
+        if slot in _local:
+            _local.move_to_end(slot)
+            return True, _local[slot]
+    return False, None
+
+
+def _canonical(result):
+    """(payload, result as read back from it): every caller gets the value
+    a Redis hit would return, whichever worker computed it."""
+    payload = json.dumps(result, default=str)
+    return payload, json.loads(payload)
+
+
+def _shared(name: str, field: str, compute):
+    """Read `field` of hash `name`, or compute it; only one worker computes
+    it at a time, the others wait for its result."""
+    lock = f"{name}:lock:{field}"
+    deadline = time.monotonic() + LOCK_TTL_MS / 1000
+    while True:
+        raw = r.hget(name, field)
+        if raw is not None:
+            return json.loads(raw)
+        token = uuid.uuid4().hex
+        if r.set(lock, token, nx=True, px=LOCK_TTL_MS):
+            try:
+                payload, result = _canonical(compute())
+                pipe = r.pipeline()
+                pipe.hset(name, field, payload)
+                pipe.expire(name, MEMO_TTL)
+                pipe.execute()
+                return result
+            finally:
+                if r.get(lock) == token.encode():
+                    r.delete(lock)
+        if time.monotonic() > deadline:
+            # the other worker is stuck or gone; do not wait forever
+            return _canonical(compute())[1]
+        time.sleep(WAIT_STEP)
+
+
+def memoize(key: str, name: str, compute, *args):
+    """
+    Result of `compute()` for the current version of dataset `key`.
+
+    `name` and `args` identify the computation (they must be JSON-serialisable,
+    as must the result; numpy values and the like come back as they read
+    from JSON, with `str` for anything else). Results are kept in this worker
+    and in Redis for the other workers; concurrent identical requests
+    compute it once.
+    """
+    version = get_version(key)
+    if not version:
+        return _canonical(compute())[1]
+    field = json.dumps([name, *args])
+    slot = (key, version, field)
+
+    hit, result = _cached(slot)
+    if hit:
+        return result
+    with _lock:
+        flight = _flights.setdefault(slot, threading.Lock())
+    with flight:
+        hit, result = _cached(slot)
+        if not hit:
+            result = _shared(memo_key(key, version), field, compute)
+            _remember(slot, result)
+    with _lock:
+        _flights.pop(slot, None)
+    return result
+
+
+def peek(key: str, name: str, *args):
+    """(True, result) if `memoize` already has the result of (name, *args)
+    for the current version of `key`, otherwise (False, None). Never computes."""
+    version = get_version(key)
+    if not version:
+        return False, None
+    field = json.dumps([name, *args])
+    slot = (key, version, field)
+    hit, result = _cached(slot)
+    if hit:
+        return hit, result
+    raw = r.hget(memo_key(key, version), field)
+    if raw is None:
+        return False, None
+    result = json.loads(raw)
+    _remember(slot, result)
+    return True, result
+
+
+def invalidate_memo(message=None):
+    """Pub/Sub handler: forget results of versions older than the published
+    one, or every result of the key when it was rewritten as a whole (its
+    versions may have started again at 1, see df_manager)."""
+    update = parse_update(message)
+    with _lock:
+        if update is None:
+            stale = list(_local)
+        elif update.get("columns") is None:
+            stale = [s for s in _local if s[0] == update["key"]]
+        else:
+            stale = [s for s in _local if s[0] == update["key"] and s[1] < update["version"]]
+        for slot in stale:
+            del _local[slot]
+    names = {memo_key(key, version) for key, version, _ in stale}
+    if names:
+        r.delete(*names)
@@ -0,0 +1,105 @@
+import json
+import redis
+from main.redis_utils.pubsub import r
+from main.callbacks.df_manager import get_columns, get_manifest
+from main.functions.summary import column_profiles
+from main.functions.sketches import ColumnSketch, sketch_series
+from main.utils.errors import AppException
+
+# Per-column summaries of a dataset, stored next to it:
+#   {key}:profile    hash, column -> JSON column profile (exact statistics)
+#   {key}:sketch     hash, column -> JSON ColumnSketch state (approximate mode)
+# Each value is stored as {"version", "value"}, tagged with the column
+# version it was computed from; anything else found there (e.g. an earlier
+# format) is recomputed. Nothing is unpickled from Redis. A write
+# bumps the version of the columns it touched only (see df_manager), so after
+# a one-column fill only that column is loaded and summarised again.
+
+
+def profile_key(key: str) -> str:
+    return f"{key}:profile"
+
+
+def sketch_key(key: str) -> str:
+    return f"{key}:sketch"
+
+
+def _dumps(version: int, value) -> str:
+    return json.dumps({"version": version, "value": value})
+
+
+def _loads(raw, from_json):
+    """The stored {"version", "value"} entry, or None if `raw` is not one."""
+    try:
+        entry = json.loads(raw)
+        return {"version": entry["version"], "value": from_json(entry["value"])}
+    except (ValueError, KeyError, TypeError):
+        return None
+
+
+def _per_column(key: str, name: str, compute, to_json=None, from_json=None, columns=None):
+    """Return (manifest, {column: value}) from hash `name`, recomputing the
+    values of columns whose version changed with `compute(df)`. Values are
+    stored as `to_json(value)` and read back with `from_json`. With
+    `columns`, only those are looked at (and loaded if need be)."""
+    to_json = to_json or (lambda value: value)
+    from_json = from_json or (lambda value: value)
+    try:
+        manifest = get_manifest(key)
+        if manifest is None:
+            raise AppException("No DataFrame found", status_code=404)
+
+        raw = {field.decode(): value for field, value in r.hgetall(name).items()}
+        stored = {}
+        for c, value in raw.items():
+            entry = _loads(value, from_json)
+            if entry is not None:
+                stored[c] = entry
+        versions = manifest["col_versions"]
+        wanted = manifest["columns"] if columns is None else [c for c in columns if c in versions]
+        dirty = [c for c in wanted if stored.get(c, {}).get("version") != versions[c]]
+        removed = [c for c in raw if c not in versions]
+
+        if dirty:
+            fresh = compute(get_columns(dirty, key=key))
+            stored.update({c: {"version": versions[c], "value": fresh[c]} for c in dirty})
+        if dirty or removed:
+            pipe = r.pipeline()
+            if dirty:
+                pipe.hset(name, mapping={c: _dumps(versions[c], to_json(fresh[c])) for c in dirty})
+            if removed:
+                pipe.hdel(name, *removed)
+            pipe.execute()
+
+        return manifest, {c: stored[c]["value"] for c in wanted}
+    except AppException:
+        raise
+    except redis.exceptions.ConnectionError as e:
+        raise AppException("Failed to connect to Redis", extra=str(e), status_code=503)
+
+
+def get_profiles(key: str = "main_df", columns=None):
+    """(manifest, {column: profile}) with exact statistics, see column_profiles."""
+    return _per_column(key, profile_key(key), column_profiles, columns=columns)
+
+
+def get_sketches(key: str = "main_df", columns=None):
+    """(manifest, {column: ColumnSketch}) for the approximate mode."""
+    def compute(df):
+        return {c: sketch_series(df[c]) for c in df.columns}
+    return _per_column(key, sketch_key(key), compute, ColumnSketch.state, ColumnSketch.from_state, columns)
+
+
+def put_sketches(key: str, sketches: dict, version: int):
+    """Store sketches built while ingesting the data written as `version`,
+    so the first approximate request does not have to read the columns."""
+    try:
+        pipe = r.pipeline()
+        pipe.delete(sketch_key(key))
+        if sketches:
+            pipe.hset(sketch_key(key), mapping={
+                c: _dumps(version, s.state()) for c, s in sketches.items()
+            })
+        pipe.execute()
+    except redis.exceptions.ConnectionError as e:
+        raise AppException("Failed to connect to Redis", extra=str(e), status_code=503)
@@ -0,0 +1,139 @@
+import os
+import hashlib
+import shutil
+import time
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+# Host-local copies of dataset columns as Arrow IPC files, normally on tmpfs.
+# Workers memory-map them read-only, so numeric columns share the same
+# physical pages across every uvicorn worker on the host instead of each
+# worker holding its own decoded copy. Redis stays the source of truth;
+# this is only a cache in front of it.
+#
+# File names carry the dataset's generation (a nonce set when its manifest
+# is created), because column versions start again at 1 when Redis loses
+# the dataset while these files survive.
+_default_dir = "/dev/shm/dataanalysis" if os.path.isdir("/dev/shm") else ""
+SHM_DIR = os.getenv("DF_SHM_DIR", _default_dir)
+ENABLED = bool(SHM_DIR) and pa is not None
+# Datasets no worker on this host has read or written for this long (e.g.
+# those of sessions that ended) are deleted; Redis still has them.
+IDLE_TTL = int(os.getenv("DF_SHM_IDLE_TTL", 6 * 3600))
+SWEEP_EVERY = 600  # seconds between idle sweeps of one worker
+_last_sweep = 0.0
+
+
+def _dataset_dir(key: str) -> str:
+    return os.path.join(SHM_DIR, hashlib.md5(key.encode()).hexdigest())
+
+
+def _file_name(column: str, col_version: int, generation: str) -> str:
+    return f"{generation}-{col_version}-{hashlib.md5(column.encode()).hexdigest()}.arrow"
+
+
+def _to_arrow(column: str, values) -> "pa.Table":
+    # Plain numeric arrays go in as-is so NaN stays NaN instead of becoming
+    # an Arrow null; without a validity bitmap pandas can map them zero-copy.
+    if isinstance(values, (np.ndarray, pd.arrays.NumpyExtensionArray)) and values.dtype.kind in "fiub":
+        return pa.table({column: pa.array(np.asarray(values))})
+    return pa.Table.from_pandas(pd.DataFrame({column: values}, copy=False), preserve_index=False)
+
+
+def write_column(key: str, column: str, col_version: int, generation: str, values) -> bool:
+    """Materialise one column version; returns False if it could not be written."""
+    if not ENABLED:
+        return False
+    directory = _dataset_dir(key)
+    path = os.path.join(directory, _file_name(column, col_version, generation))
+    if os.path.exists(path):
+        _touch(key)
+        return True
+    try:
+        os.makedirs(directory, exist_ok=True)
+        table = _to_arrow(column, values)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with pa.OSFile(tmp, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp, path)  # readers never see a half-written file
+        _sweep()
+        return True
+    except Exception as e:
+        print(f"[shm] could not write column '{column}': {e}")
+        return False
+
+
+def read_column(key: str, column: str, col_version: int, generation: str):
+    """Map a column version read-only, or return None if it is not on this host."""
+    if not ENABLED:
+        return None
+    path = os.path.join(_dataset_dir(key), _file_name(column, col_version, generation))
+    try:
+        source = pa.memory_map(path, "r")
+    except (FileNotFoundError, OSError):
+        return None
+    _touch(key)
+    table = pa.ipc.open_file(source).read_all()
+    return table.to_pandas(split_blocks=True)[column].array
+
+
+def prune(key: str, manifest: dict):
+    """Delete column files the manifest no longer references. Workers that
+    still map an old file keep their pages until they drop it."""
+    if not ENABLED:
+        return
+    generation = manifest.get("generation", "")
+    live = {_file_name(c, v, generation) for c, v in manifest["col_versions"].items()}
+    directory = _dataset_dir(key)
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return
+    for name in names:
+        if name.endswith(".arrow") and name not in live:
+            try:
+                os.remove(os.path.join(directory, name))
+            except FileNotFoundError:
+                pass
+
+def clear(key: str):
+    """Delete every column file of `key`, e.g. those of an earlier
+    generation of the dataset."""
+    if not ENABLED:
+        return
+    shutil.rmtree(_dataset_dir(key), ignore_errors=True)
+
+
+def _touch(key: str):
+    """Mark the dataset as in use, so the idle sweep leaves it alone."""
+    try:
+        os.utime(_dataset_dir(key))
+    except OSError:
+        pass
+
+
+def _sweep():
+    """Delete datasets idle for longer than IDLE_TTL (at most every SWEEP_EVERY)."""
+    global _last_sweep
+    now = time.time()
+    if now - _last_sweep < SWEEP_EVERY:
+        return
+    _last_sweep = now
+    try:
+        names = os.listdir(SHM_DIR)
+    except FileNotFoundError:
+        return
+    for name in names:
+        directory = os.path.join(SHM_DIR, name)
+        try:
+            idle = now - os.stat(directory).st_mtime > IDLE_TTL
+        except FileNotFoundError:
+            continue
+        if idle:
+            shutil.rmtree(directory, ignore_errors=True)
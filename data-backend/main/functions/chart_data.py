@@ -0,0 +1,218 @@
+import numpy as np
+import pandas as pd
+
+# Pre-aggregated chart data for client-side rendering: the same aggregation
+# seaborn would do for these chart types, without rasterising anything.
+# Payload size depends on the number of categories / bins, never on rows.
+MAX_LINE_POINTS = 1000
+MAX_BINS = 200
+MAX_OUTLIERS = 100
+
+
+def _values(values) -> list:
+    """JSON-safe list (numpy scalars -> Python, NaN -> None)."""
+    return [None if isinstance(v, float) and np.isnan(v) else v for v in np.asarray(values).tolist()]
+
+
+def _groups(data: pd.DataFrame, hue: str = None):
+    """(name, frame) per hue level, or the whole frame once."""
+    if hue is None:
+        return [(None, data)]
+    return [
+        (level.item() if isinstance(level, np.generic) else level, group)
+        for level, group in data.groupby(hue, observed=True, sort=True)
+    ]
+
+
+def _is_numeric(series: pd.Series) -> bool:
+    return pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series)
+
+
+def _histogram(data, x=None, y=None, hue=None, **_):
+    column = x if x is not None else y
+    values = data[column].dropna().to_numpy(dtype=np.float64)
+    edges = np.histogram_bin_edges(values, bins="auto") if len(values) else np.array([0.0, 1.0])
+    if len(edges) > MAX_BINS + 1:
+        edges = np.histogram_bin_edges(values, bins=MAX_BINS)
+    series = []
+    for level, group in _groups(data, hue):
+        counts, _ = np.histogram(group[column].dropna().to_numpy(dtype=np.float64), bins=edges)
+        series.append({"name": level if hue else column, "counts": counts.tolist()})
+    return {"column": column, "edges": edges.tolist(), "series": series}
+
+
+def _count(data, x=None, hue=None, **_):
+    column = x if x is not None else hue
+    categories = data[column].dropna().unique()
+    if hue is None or hue == column:
+        counts = data[column].value_counts().reindex(categories, fill_value=0)
+        return {"column": column, "categories": _values(categories),
+                "series": [{"name": column, "counts": counts.tolist()}]}
+    table = pd.crosstab(data[column], data[hue]).reindex(categories, fill_value=0)
+    return {
+        "column": column,
+        "categories": _values(categories),
+        "series": [
+            {"name": name, "counts": table[level].tolist()}
+            for name, level in zip(_values(table.columns), table.columns)
+        ],
+    }
+
+
+def _bar(data, x=None, y=None, hue=None, **_):
+    if y is None:
+        return {"chart": "count", **_count(data, x=x, hue=hue)}
+    categories = data[x].dropna().unique() if x is not None else np.array([y])
+    series = []
+    for level, group in _groups(data, hue):
+        if x is not None:
+            agg = group.groupby(x, observed=True)[y].agg(["mean", "std", "count"]).reindex(categories)
+        else:
+            agg = group[y].agg(["mean", "std", "count"]).to_frame().T
+        # 95% normal-approximation interval (seaborn bootstraps its error bars)
+        ci = 1.96 * agg["std"] / np.sqrt(agg["count"])
+        series.append({"name": level if hue else y, "mean": _values(agg["mean"]), "ci": _values(ci),
+                       "n": _values(agg["count"].fillna(0).astype(int))})
+    return {"x": x, "y": y, "categories": _values(categories), "series": series}
+
+
+def _five_numbers(values: np.ndarray) -> dict:
+    values = values[~np.isnan(values)]
+    if len(values) == 0:
+        return {"n": 0}
+    q1, median, q3 = np.percentile(values, [25, 50, 75])
+    iqr = q3 - q1
+    inside = values[(values >= q1 - 1.5 * iqr) & (values <= q3 + 1.5 * iqr)]
+    outliers = values[(values < q1 - 1.5 * iqr) | (values > q3 + 1.5 * iqr)]
+    return {
+        "n": int(len(values)),
+        "min": float(values.min()), "whisker_low": float(inside.min()),
+        "q1": float(q1), "median": float(median), "q3": float(q3),
+        "whisker_high": float(inside.max()), "max": float(values.max()),
+        "outliers": int(len(outliers)),
+        # the most extreme ones, so the chart can still draw them
+        "outlier_values": np.sort(outliers[np.argsort(-np.abs(outliers - median))[:MAX_OUTLIERS]]).tolist(),
+    }
+
+
+def _boxplot(data, x=None, y=None, hue=None, **_):
+    if x is not None and y is not None and not _is_numeric(data[y]) and _is_numeric(data[x]):
+        value, category = x, y  # horizontal boxes
+    else:
+        value, category = (y, x) if y is not None else (x, None)
+    categories = data[category].dropna().unique() if category else np.array([value])
+    series = []
+    for level, group in _groups(data, hue):
+        if category:
+            boxes = {k: g[value].to_numpy(dtype=np.float64) for k, g in group.groupby(category, observed=True)}
+        else:
+            boxes = {value: group[value].to_numpy(dtype=np.float64)}
+        series.append({
+            "name": level if hue else value,
+            "boxes": [_five_numbers(boxes.get(c, np.empty(0))) for c in categories],
+        })
+    return {"value": value, "category": category, "categories": _values(categories), "series": series}
+
+
+def _is_temporal(series: pd.Series) -> bool:
+    return pd.api.types.is_datetime64_any_dtype(series) or pd.api.types.is_timedelta64_dtype(series)
+
+
+def _ticks(series: pd.Series):
+    """A datetime/timedelta column as float offsets from its first tick, in
+    ticks of its unit (NaT -> NaN), and that first tick."""
+    ticks = series.array.asi8
+    valid = ~series.isna().to_numpy()
+    origin = int(ticks[valid].min()) if valid.any() else 0
+    values = (ticks - origin).astype(np.float64)
+    values[~valid] = np.nan
+    return values, origin
+
+
+def _from_ticks(values: np.ndarray, origin: int, like: pd.Series) -> pd.Index:
+    ticks = pd.array(np.round(values), dtype="Int64") + origin
+    if pd.api.types.is_timedelta64_dtype(like):
+        return pd.to_timedelta(ticks, unit=like.dt.unit)
+    stamps = pd.to_datetime(ticks, unit=like.dt.unit)
+    return stamps if like.dt.tz is None else stamps.tz_localize("UTC").tz_convert(like.dt.tz)
+
+
+def _iso(values) -> list:
+    """ISO 8601 strings for timestamps and timedeltas (NaT -> None)."""
+    return [None if pd.isna(v) else v.isoformat() for v in values]
+
+
+def _line(data, x=None, y=None, hue=None, **_):
+    temporal = _is_temporal(data[x])
+    binned = (_is_numeric(data[x]) or temporal) and data[x].nunique() > MAX_LINE_POINTS
+    if binned:
+        # too many distinct x values: average over equal-width x bins,
+        # each reported at its centre; datetimes and timedeltas are binned
+        # on their int64 view
+        values, origin = _ticks(data[x]) if temporal else (data[x].to_numpy(dtype=np.float64), 0)
+        lo, hi = np.nanmin(values), np.nanmax(values)
+        width = (hi - lo) / MAX_LINE_POINTS
+        bins = np.minimum((values - lo) // width, MAX_LINE_POINTS - 1)
+        key = lo + (bins + 0.5) * width
+        if temporal:
+            key = pd.Series(_from_ticks(key, origin, data[x]), index=data.index)
+    else:
+        key = data[x]
+    series = []
+    for level, group in _groups(data.assign(_x=key), hue):
+        agg = group.groupby("_x", observed=True, sort=True)[y].agg(["mean", "std", "count"])
+        series.append({
+            "name": level if hue else y,
+            "x": _iso(agg.index) if temporal else _values(agg.index.to_numpy()),
+            "mean": _values(agg["mean"]),
+            "ci": _values(1.96 * agg["std"] / np.sqrt(agg["count"])),
+        })
+    return {"x": x, "y": y, "binned": binned, "series": series}
+
+
+def _pie(data, x=None, y=None, hue=None, **_):
+    series = []
+    for level, group in _groups(data, hue):
+        if y is None:
+            agg = group[x].value_counts()
+        else:
+            agg = group.groupby(x, observed=True)[y].sum().sort_values(ascending=False)
+        agg = agg[agg > 0]
+        series.append({"name": level if hue else x, "labels": _values(agg.index.to_numpy()),
+                       "values": _values(agg.to_numpy())})
+    return {"x": x, "y": y, "series": series}
+
+
+SPEC_FUNCS = {
+    "histogram": _histogram,
+    "count": _count,
+    "bar": _bar,
+    "boxplot": _boxplot,
+    "line": _line,
+    "pie": _pie,
+}
+
+
+def chart_spec(data: pd.DataFrame, chart: str, x=None, y=None, hue=None, **options) -> dict:
+    """
+    Aggregated series for `chart` instead of an image, e.g. for a histogram
+
+        {"chart": "histogram", "column": ..., "edges": [...],
+         "series": [{"name": <hue level or column>, "counts": [...]}]}
+
+    Supported charts are the keys of SPEC_FUNCS.
+    """
+    if chart not in SPEC_FUNCS:
+        raise ValueError(f"Data output is not available for '{chart}'. Choose from: {', '.join(SPEC_FUNCS)}.")
+    for col in (x, y, hue):
+        if col is not None and col not in data.columns:
+            raise ValueError(f"Column '{col}' not found in DataFrame.")
+    if chart in ("histogram", "boxplot", "bar") and x is None and y is None:
+        raise ValueError(f"{chart.capitalize()} data requires x or y.")
+    if chart == "count" and x is None and hue is None:
+        raise ValueError("Count data requires x or hue.")
+    if chart == "line" and (x is None or y is None):
+        raise ValueError("Line data requires both x and y.")
+    if chart == "pie" and x is None:
+        raise ValueError("Pie data requires 'x' (labels).")
+    return {"chart": chart, "hue": hue, **SPEC_FUNCS[chart](data, x=x, y=y, hue=hue, **options)}
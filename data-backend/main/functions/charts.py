@@ -1,8 +1,20 @@
 import seaborn as sns
 import matplotlib.pyplot as plt
 import pandas as pd
+import numpy as np
 import io, base64
 
+_styled = False
+
+
+def use_style():
+    """Apply the chart style once per process (render workers do it at startup)."""
+    global _styled
+    if not _styled:
+        sns.set_style("darkgrid")
+        plt.style.use("dark_background")
+        _styled = True
+
 # -----------------------------
 # Universal Plot Function with Validation, Multi-Column Support & Base64 Return
 # -----------------------------
@@ -17,8 +29,8 @@ def _plot_pie(data, x, y=None, hue=None):
 
         n = len(levels)
         ncols = min(3, n)
-        nrows = ceil(n / ncols)
-        fig, axes = plt.subplots(nrows, ncols, figsize=kwargs.pop("figsize", (6*ncols, 6*nrows)))
+        nrows = -(-n // ncols)
+        fig, axes = plt.subplots(nrows, ncols, figsize=(6*ncols, 6*nrows))
         axes = np.atleast_1d(axes).ravel()
 
         for ax, lv in zip(axes, levels):
@@ -66,25 +78,7 @@ def _plot_pie(data, x, y=None, hue=None):
     return ax
 
 
-def plot_chart(data, chart, x=None, y=None, hue=None, style=None, size=None, kde=False, multiple=None, cols=None):
-    """
-    Universal plotting function for Seaborn with:
-      - Error handling
-      - Multi-column support (x, y, hue)
-      - Returns Base64 PNG instead of Axes
-    """
-
-    # -----------------------------
-    # Handle multi-column hue (combine)
-    # -----------------------------
-    if isinstance(hue, list):
-        for col in hue:
-            if col not in data.columns:
-                raise ValueError(f"Hue column '{col}' not found in DataFrame.")
-        hue_col = "_combined_hue"
-        data[hue_col] = data[hue].astype(str).agg("-".join, axis=1)
-        hue = hue_col
-
+def _validate(chart, x=None, y=None, hue=None, cols=None):
     # -----------------------------
     # Validation Rules
     # -----------------------------
@@ -105,10 +99,6 @@ def plot_chart(data, chart, x=None, y=None, hue=None, style=None, size=None, kde
         if x is None and hue is None:
             raise ValueError("Count plot requires x or hue.")
 
-    if chart == "heatmap":
-        if cols is None:
-            raise ValueError("Heatmap requires 'cols' parameter with numeric columns.")
-
     if chart == "pair":
         if cols is None:
             raise ValueError("Pairplot requires 'cols' parameter.")
@@ -126,51 +116,24 @@ def plot_chart(data, chart, x=None, y=None, hue=None, style=None, size=None, kde
 
     print("Validation Ends")
 
-    # -----------------------------
-    # Multi-column x or y handling
-    # -----------------------------
-    def handle_multiple(columns, axis_name):
-        for col in columns:
-            if col not in data.columns:
-                raise ValueError(f"Column '{col}' in {axis_name} not found in DataFrame.")
-
-    if isinstance(x, list):
-        handle_multiple(x, "x")
-        imgs = []
-        for col in x:
-            imgs.append(plot_chart(data, chart, x=col, y=y, hue=hue, style=style, size=size, kde=kde, multiple=multiple, cols=cols))
-        return imgs
-
-    print("Multi-column x handling",y)
-    
-    if isinstance(y, list) and len(y) > 0:
-        handle_multiple(y, "y")
-        imgs = []
-        for col in y:
-            imgs.append(plot_chart(data, chart, x=x, y=col, hue=hue, style=style, size=size, kde=kde, multiple=multiple, cols=cols))
-        return imgs
-    
-    print("Multi-column y handling")
 
+def _draw(data, chart, x=None, y=None, hue=None, style=None, size=None, kde=False, multiple=None, cols=None,
+          corr=None):
+    """Draw a single chart on the current axes (pair/joint/pie make their own figure)."""
     # -----------------------------
     # Dictionary as switch-case
     # -----------------------------
-    print("Dictionary as switch-case")
-    
-    plt.figure(figsize=(15, 7))
-    sns.set_style("darkgrid")
-    plt.style.use("dark_background")
     plot_funcs = {
         "scatter": lambda: sns.scatterplot(data=data, x=x, y=y, hue=hue,palette='Set1'),
         "line":    lambda: sns.lineplot(data=data, x=x, y=y, hue=hue, style=style, size=size,palette="Set1"),
         "bar":     lambda: sns.barplot(data=data, x=x, y=y, hue=hue,palette="Set1"),
         "count":   lambda: sns.countplot(data=data, x=x, hue=hue,palette="Set1"),
-        "histogram":lambda: sns.histplot(data=data, x=x, y=y, hue=hue, kde=kde, multiple=multiple,palette="Set1"),
+        "histogram":lambda: sns.histplot(data=data, x=x, y=y, hue=hue, kde=kde, multiple=multiple or "layer",palette="Set1"),
         "boxplot": lambda: sns.boxplot(data=data, x=x, y=y, hue=hue,palette="Set1"),
         "violin":  lambda: sns.violinplot(data=data, x=x, y=y, hue=hue, split=True if hue else False),
         "strip":   lambda: sns.stripplot(data=data, x=x, y=y, hue=hue,palette="Set1"),
         "swarm":   lambda: sns.swarmplot(data=data, x=x, y=y, hue=hue,palette="Set1"),
-        "heatmap": lambda: sns.heatmap(data[cols].corr() if cols else data.corr(), annot=True, cmap="coolwarm"),
+        "heatmap": lambda: sns.heatmap(corr if corr is not None else data[cols].corr() if cols else data.corr(numeric_only=True), annot=True, cmap="coolwarm"),
         "pair":    lambda: sns.pairplot(data[cols] if cols else data, hue=hue,palette="Set1"),
         "joint":   lambda: sns.jointplot(data=data, x=x, y=y, hue=hue,palette="Set1"),
         "pie": lambda: _plot_pie(data, x, y, hue),
@@ -185,7 +148,78 @@ def plot_chart(data, chart, x=None, y=None, hue=None, style=None, size=None, kde
         chart='count'
     print(chart)
         
-    result = plot_funcs[chart]()
+    return plot_funcs[chart]()
+
+
+def _save(fig, as_bytes=False, dpi=300):
+    # Save to buffer
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", bbox_inches="tight", dpi=dpi)
+    buf.seek(0)
+    plt.close("all")  # Close AFTER saving; pair/joint leave the initial figure open too
+    if as_bytes:
+        return buf.getvalue()
+
+    # Encode in base64
+    img_base64 = base64.b64encode(buf.read()).decode("utf-8")
+
+    return f"data:image/png;base64,{img_base64}"
+
+
+def plot_chart(data, chart, x=None, y=None, hue=None, style=None, size=None, kde=False, multiple=None, cols=None,
+               as_bytes=False, dpi=300, corr=None):
+    """
+    Universal plotting function for Seaborn with:
+      - Error handling
+      - Multi-column support (x, y, hue)
+      - Returns Base64 PNG instead of Axes (the raw PNG bytes with `as_bytes`)
+      - `dpi` trades resolution for speed (e.g. quick previews)
+      - `corr`: a precomputed correlation matrix (DataFrame) for heatmaps
+    """
+
+    # -----------------------------
+    # Handle multi-column hue (combine)
+    # -----------------------------
+    if isinstance(hue, list):
+        for col in hue:
+            if col not in data.columns:
+                raise ValueError(f"Hue column '{col}' not found in DataFrame.")
+        hue_col = "_combined_hue"
+        data[hue_col] = data[hue].astype(str).agg("-".join, axis=1)
+        hue = hue_col
+
+    _validate(chart, x, y, hue, cols)
+
+    # -----------------------------
+    # Multi-column x or y handling
+    # -----------------------------
+    def handle_multiple(columns, axis_name):
+        for col in columns:
+            if col not in data.columns:
+                raise ValueError(f"Column '{col}' in {axis_name} not found in DataFrame.")
+
+    if isinstance(x, list):
+        handle_multiple(x, "x")
+        imgs = []
+        for col in x:
+            imgs.append(plot_chart(data, chart, x=col, y=y, hue=hue, style=style, size=size, kde=kde, multiple=multiple, cols=cols, as_bytes=as_bytes, dpi=dpi))
+        return imgs
+
+    print("Multi-column x handling",y)
+    
+    if isinstance(y, list) and len(y) > 0:
+        handle_multiple(y, "y")
+        imgs = []
+        for col in y:
+            imgs.append(plot_chart(data, chart, x=x, y=col, hue=hue, style=style, size=size, kde=kde, multiple=multiple, cols=cols, as_bytes=as_bytes, dpi=dpi))
+        return imgs
+    
+    print("Multi-column y handling")
+
+    use_style()
+    plt.figure(figsize=(15, 7))
+    result = _draw(data, chart, x=x, y=y, hue=hue, style=style, size=size, kde=kde, multiple=multiple, cols=cols,
+                   corr=corr)
 
     # Handle seaborn-style plots (pairplot/jointplot)
     if chart in ["pair", "joint"]:
@@ -196,13 +230,33 @@ def plot_chart(data, chart, x=None, y=None, hue=None, style=None, size=None, kde
         if hasattr(ax, "legend_") and ax.legend_ is not None:
             ax.legend(loc="best")
 
-    # Save to buffer
-    buf = io.BytesIO()
-    fig.savefig(buf, format="png", bbox_inches="tight", dpi=300)
-    buf.seek(0)
+    return _save(fig, as_bytes, dpi)
 
-    # Encode in base64
-    img_base64 = base64.b64encode(buf.read()).decode("utf-8")
-    plt.close(fig)  # Close AFTER saving
 
-    return f"data:image/png;base64,{img_base64}"
+# Charts drawn on a single axes, which can share one figure as facets
+FACET_CHARTS = ["scatter", "line", "bar", "count", "histogram", "boxplot", "violin", "strip", "swarm"]
+
+
+def plot_facets(panels, chart, hue=None, style=None, size=None, kde=False, multiple=None, cols=None,
+                as_bytes=False, dpi=300):
+    """
+    One figure with a panel per (data, x, y) in `panels`, e.g. one per
+    selected y column, `cols` panels per row (3 by default).
+    """
+    if chart not in FACET_CHARTS:
+        raise ValueError(f"Chart '{chart}' cannot be faceted. Choose from: {', '.join(FACET_CHARTS)}.")
+    for _, x, y in panels:
+        _validate(chart, x, y, hue)
+
+    use_style()
+    wrap = min(cols or 3, len(panels))
+    rows = -(-len(panels) // wrap)
+    fig, axes = plt.subplots(rows, wrap, figsize=(6 * wrap, 4 * rows), squeeze=False)
+    for ax, (data, x, y) in zip(axes.flat, panels):
+        plt.sca(ax)
+        _draw(data, chart, x=x, y=y, hue=hue, style=style, size=size, kde=kde, multiple=multiple)
+        ax.set_title(" by ".join(c for c in (y, x) if c is not None))
+    for ax in axes.flat[len(panels):]:
+        ax.set_visible(False)
+    fig.tight_layout()
+    return _save(fig, as_bytes, dpi)
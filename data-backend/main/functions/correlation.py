@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+from scipy.stats import kendalltau
+
+METHODS = ("pearson", "spearman", "kendall")
+
+
+def as_matrix(df: pd.DataFrame) -> np.ndarray:
+    """Rows x columns float64 values, missing values as NaN."""
+    return df.to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def pearson(values: np.ndarray) -> np.ndarray:
+    """
+    Pearson matrix of the columns of `values`, each pair over the rows where
+    both are present (like DataFrame.corr), from a few matrix products
+    instead of a loop over pairs.
+    """
+    present = ~np.isnan(values)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        if present.all():
+            x = values - values.mean(axis=0)
+            cov = x.T @ x
+            var = np.diag(cov)
+            matrix = cov / np.sqrt(np.outer(var, var))
+        else:
+            mask = present.astype(np.float64)
+            mean = np.where(present, values, 0.0).sum(axis=0) / np.maximum(mask.sum(axis=0), 1)
+            x = np.where(present, values - mean, 0.0)  # centred, so the sums below stay small
+            n = mask.T @ mask             # n[i, j]: rows where i and j are both present
+            sx = x.T @ mask               # sum of column i over those rows
+            sxx = (x * x).T @ mask
+            cov = x.T @ x - sx * sx.T / n
+            var = sxx - sx * sx / n
+            matrix = cov / np.sqrt(var * var.T)
+            matrix[n < 2] = np.nan
+    matrix = np.clip(matrix, -1.0, 1.0)
+    # a column correlates perfectly with itself, unless it is constant
+    diagonal = np.diag(matrix)
+    np.fill_diagonal(matrix, np.where(np.isnan(diagonal), np.nan, 1.0))
+    return matrix
+
+
+def ranks(series: pd.Series) -> np.ndarray:
+    """Average ranks of the non-missing values (NaN stays NaN)."""
+    return series.rank(method="average").to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def spearman(ranked: np.ndarray) -> np.ndarray:
+    """
+    Spearman matrix from per-column ranks (see `ranks`): the Pearson matrix
+    of the ranks. Each column is ranked over all of its values, so with
+    missing values this differs slightly from DataFrame.corr, which re-ranks
+    every pair's complete rows; without missing values it is identical.
+    """
+    return pearson(ranked)
+
+
+def kendall_pairs(values: np.ndarray, pairs) -> list:
+    """Kendall's tau-b for each (i, j) column pair, over complete rows."""
+    result = []
+    for i, j in pairs:
+        both = ~(np.isnan(values[:, i]) | np.isnan(values[:, j]))
+        if both.sum() < 2:
+            result.append(np.nan)
+        else:
+            result.append(float(kendalltau(values[both, i], values[both, j]).statistic))
+    return result
+
+
+def upper_pairs(k: int) -> list:
+    """(i, j) with i < j, the pairs a symmetric matrix needs."""
+    i, j = np.triu_indices(k, 1)
+    return list(zip(i.tolist(), j.tolist()))
+
+
+def from_pairs(k: int, pairs, taus, diagonal) -> np.ndarray:
+    matrix = np.full((k, k), np.nan)
+    if pairs:
+        i, j = np.array(pairs).T
+        matrix[i, j] = matrix[j, i] = taus
+    np.fill_diagonal(matrix, diagonal)
+    return matrix
+
+
+def triplets(matrix, decimals: int = 2) -> list:
+    """[[row, column, value], ...] for every cell, rounded (NaN -> None)."""
+    matrix = np.round(np.asarray(matrix, dtype=np.float64), decimals)
+    k = len(matrix)
+    rows, cols = np.divmod(np.arange(k * k), k)
+    values = np.where(np.isnan(matrix), None, matrix).ravel().tolist()
+    return list(map(list, zip(rows.tolist(), cols.tolist(), values)))
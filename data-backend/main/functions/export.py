@@ -0,0 +1,108 @@
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+# format -> (media type, file extension)
+FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+}
+ARROW_FORMATS = ("parquet", "arrow")
+BATCH_ROWS = 50_000
+
+
+class _Drain:
+    """Write-only file object whose contents are handed out after each batch,
+    so Arrow writers never accumulate the whole output."""
+
+    def __init__(self):
+        self._parts = []
+        self.closed = False
+
+    def write(self, data) -> int:
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def iter_batches(df: pd.DataFrame, batch_rows: int = BATCH_ROWS, positions=None):
+    """Slices of `df` (in `positions` order if given), `batch_rows` at a time."""
+    total = len(df) if positions is None else len(positions)
+    for start in range(0, total, batch_rows):
+        if positions is None:
+            yield df.iloc[start:start + batch_rows]
+        else:
+            yield df.iloc[positions[start:start + batch_rows]]
+
+
+def _csv(batches, header: pd.DataFrame):
+    first = True
+    for chunk in batches:
+        yield chunk.to_csv(index=False, header=first).encode()
+        first = False
+    if first:  # no rows: still send the header line
+        yield header.to_csv(index=False).encode()
+
+
+def _ndjson(batches):
+    for chunk in batches:
+        if len(chunk):
+            text = chunk.to_json(orient="records", lines=True, date_format="iso")
+            yield (text if text.endswith("\n") else text + "\n").encode()
+
+
+def _arrow(batches, schema):
+    sink = _Drain()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        for chunk in batches:
+            writer.write_batch(pa.RecordBatch.from_pandas(chunk, schema=schema, preserve_index=False))
+            yield sink.take()
+    yield sink.take()
+
+
+def _parquet(batches, schema):
+    sink = _Drain()
+    with pq.ParquetWriter(sink, schema) as writer:
+        for chunk in batches:
+            # one row group per batch
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+            yield sink.take()
+    yield sink.take()
+
+
+def export_stream(df: pd.DataFrame, fmt: str, batch_rows: int = BATCH_ROWS, positions=None):
+    """
+    Generator of encoded byte chunks for `df` in `fmt` (see FORMATS).
+    Only one batch is converted at a time, so memory stays bounded by
+    `batch_rows` whatever the dataset size.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported export format '{fmt}'. Choose from: {', '.join(FORMATS)}.")
+    if fmt in ARROW_FORMATS and pa is None:
+        raise ValueError(f"Export format '{fmt}' requires pyarrow.")
+
+    batches = iter_batches(df, batch_rows, positions)
+    if fmt == "csv":
+        return _csv(batches, df.head(0))
+    if fmt == "ndjson":
+        return _ndjson(batches)
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    if fmt == "arrow":
+        return _arrow(batches, schema)
+    return _parquet(batches, schema)
@@ -0,0 +1,134 @@
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+from main.functions.paging import records
+from main.functions.sketches import ColumnSketch
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pacsv
+except ImportError:
+    pa = None
+
+# A string column becomes `category` when its distinct values are at most
+# this share of the rows (e.g. Parental_Involvement, School_Type).
+CATEGORY_RATIO = 0.5
+CHUNK_ROWS = 100_000
+
+_INT_TYPES = [np.int8, np.int16, np.int32, np.int64]
+
+
+def _smallest_int(lo, hi):
+    for t in _INT_TYPES:
+        info = np.iinfo(t)
+        if info.min <= lo and hi <= info.max:
+            return t
+    return np.int64
+
+
+def _sketch(sketches, name, values: pd.Series):
+    if sketches is not None:
+        sketches.setdefault(name, ColumnSketch()).update(values)
+
+
+def read_csv_optimized(path: str, category_ratio: float = CATEGORY_RATIO, sketches: dict = None) -> pd.DataFrame:
+    """
+    Read a CSV into a DataFrame with compact dtypes:
+      - low-cardinality strings as `category`
+      - integers in the smallest width that holds their range
+    Floats are left as float64 so statistics do not change.
+
+    Uses the Arrow streaming CSV reader when pyarrow is installed, so strings
+    are dictionary-encoded per block before they ever become Python objects.
+    Otherwise (or if a later block does not match the types inferred from
+    the first one) the file is read with pandas in chunks of CHUNK_ROWS rows.
+
+    If a `sketches` dict is given, it is filled with a ColumnSketch per
+    column, built block by block while the file is read.
+    """
+    if pa is not None:
+        try:
+            return _read_arrow(path, category_ratio, sketches)
+        except pa.ArrowInvalid:
+            if sketches is not None:
+                sketches.clear()
+    return _read_chunked(path, category_ratio, sketches)
+
+
+def _read_arrow(path: str, category_ratio: float, sketches: dict = None) -> pd.DataFrame:
+    reader = pacsv.open_csv(
+        path,
+        read_options=pacsv.ReadOptions(use_threads=True),
+        # empty fields are missing values, as with pd.read_csv
+        convert_options=pacsv.ConvertOptions(strings_can_be_null=True),
+    )
+    # Dictionary-encode strings block by block so the raw text of repeated
+    # values is never held for the whole file at once.
+    batches = []
+    for batch in reader:
+        batch = pa.RecordBatch.from_arrays(
+            [c.dictionary_encode() if pa.types.is_string(c.type) else c for c in batch.columns],
+            names=batch.schema.names,
+        )
+        if sketches is not None:
+            for name, col in zip(batch.schema.names, batch.columns):
+                _sketch(sketches, name, pd.Series(col.to_pandas()))
+        batches.append(batch)
+    if not batches:
+        return reader.schema.empty_table().to_pandas()
+    table = pa.Table.from_batches(batches).unify_dictionaries()
+    del batches
+
+    rows = table.num_rows
+    columns = []
+    for col in table.columns:
+        if pa.types.is_dictionary(col.type):
+            if len(col.chunk(0).dictionary) > rows * category_ratio:
+                col = col.cast(col.type.value_type)
+        elif pa.types.is_integer(col.type) and col.null_count == 0:
+            bounds = pc.min_max(col)
+            target = _smallest_int(bounds["min"].as_py(), bounds["max"].as_py())
+            col = col.cast(pa.from_numpy_dtype(target))
+        columns.append(col)
+    table = pa.table(columns, names=table.column_names)
+    # self_destruct frees each Arrow column as soon as it has been converted
+    return table.to_pandas(split_blocks=True, self_destruct=True)
+
+
+def _read_chunked(path: str, category_ratio: float, sketches: dict = None) -> pd.DataFrame:
+    parts = {}
+    rows = 0
+    for chunk in pd.read_csv(path, chunksize=CHUNK_ROWS):
+        rows += len(chunk)
+        for name in chunk.columns:
+            col = chunk[name]
+            if col.dtype == object:
+                col = col.astype("category")
+            elif pd.api.types.is_integer_dtype(col):
+                col = pd.to_numeric(col, downcast="integer")
+            _sketch(sketches, name, col)
+            parts.setdefault(name, []).append(col)
+
+    data = {}
+    for name, pieces in parts.items():
+        if all(isinstance(p.dtype, pd.CategoricalDtype) for p in pieces):
+            combined = pd.Series(union_categoricals(pieces, ignore_order=True), name=name)
+            if len(combined.cat.categories) > rows * category_ratio:
+                combined = combined.astype(object)
+        else:
+            # concat upcasts to the widest per-chunk width; a column that was
+            # text in only some chunks falls back to object
+            pieces = [p.astype(object) if isinstance(p.dtype, pd.CategoricalDtype) else p for p in pieces]
+            combined = pd.concat(pieces, ignore_index=True)
+        data[name] = combined.reset_index(drop=True)
+    return pd.DataFrame(data)
+
+
+def schema(df: pd.DataFrame) -> list[dict]:
+    return [{"name": col, "dtype": str(dtype)} for col, dtype in df.dtypes.items()]
+
+
+def preview_records(df: pd.DataFrame, rows: int = 100) -> list[dict]:
+    """First `rows` rows as JSON-safe records (NaN/NaT -> None)."""
+    return records(df.head(rows))
@@ -0,0 +1,61 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# Sort orders are expensive (O(n log n)) but only change when the sorted
+# column does, so they are kept per column version and later pages are a
+# slice of the cached positions.
+MAX_ORDERS = 32
+_orders = OrderedDict()
+_lock = threading.Lock()
+
+
+def _sortable(series: pd.Series) -> pd.Series:
+    # Unordered categories sort by their labels, not by appearance order
+    if isinstance(series.dtype, pd.CategoricalDtype) and not series.cat.ordered:
+        labels = series.cat.categories.astype(str)
+        rank = np.empty(len(labels), dtype=np.int64)
+        rank[np.argsort(labels, kind="stable")] = np.arange(len(labels))
+        codes = series.cat.codes.to_numpy()
+        return pd.Series(np.where(codes >= 0, rank[codes], np.nan))
+    return series
+
+
+def sort_positions(series: pd.Series, descending: bool = False, cache_key=None) -> np.ndarray:
+    """Row positions of `series` in sorted order (missing values last).
+
+    `cache_key` should identify the column version, e.g.
+    (dataset key, generation, column, column version, index version)."""
+    full_key = None if cache_key is None else (cache_key, descending)
+    if full_key is not None:
+        with _lock:
+            if full_key in _orders:
+                _orders.move_to_end(full_key)
+                return _orders[full_key]
+
+    values = _sortable(pd.Series(series.array))
+    positions = values.sort_values(ascending=not descending, kind="stable", na_position="last").index.to_numpy()
+
+    if full_key is not None:
+        with _lock:
+            _orders[full_key] = positions
+            while len(_orders) > MAX_ORDERS:
+                _orders.popitem(last=False)
+    return positions
+
+
+def page(df: pd.DataFrame, offset: int, limit: int, sort: str = None, descending: bool = False,
+         cache_key=None) -> pd.DataFrame:
+    """Rows [offset, offset + limit) of `df`, optionally sorted by `sort`."""
+    if sort is None:
+        return df.iloc[offset:offset + limit]
+    positions = sort_positions(df[sort], descending, cache_key)
+    return df.iloc[positions[offset:offset + limit]]
+
+
+def records(df: pd.DataFrame) -> list[dict]:
+    """JSON-safe records (NaN/NaT -> None)."""
+    rows = df.astype(object)
+    return rows.where(rows.notna(), None).to_dict(orient="records")
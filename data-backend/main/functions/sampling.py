@@ -0,0 +1,174 @@
+import numpy as np
+import pandas as pd
+
+# Point budgets for the charts that draw one mark per row. Above the budget
+# the frame is thinned before it reaches seaborn, so rendering time depends
+# on the budget rather than on the dataset size. Swarm layout is superlinear,
+# hence its much smaller default.
+POINT_BUDGETS = {
+    "scatter": 20_000,
+    "line": 5_000,
+    "strip": 10_000,
+    "swarm": 1_000,
+}
+SEED = 0              # samples are reproducible, so a cached chart matches a re-render
+OUTLIER_SHARE = 0.1   # of a stratum's quota, kept for the points furthest outside the fences
+
+
+def _allocate(sizes, budget: int) -> np.ndarray:
+    """Split `budget` over groups proportionally to their size (largest
+    remainder), keeping at least one row of every group while the budget
+    allows. The quotas never add up to more than `budget`."""
+    sizes = np.asarray(sizes, dtype=np.int64)
+    if sizes.sum() <= budget:
+        return sizes
+    present = np.minimum(sizes, 1)
+    if present.sum() >= budget:
+        # more groups than points: a row of each of the largest groups
+        quota = np.zeros_like(sizes)
+        quota[np.argsort(-sizes, kind="stable")[:budget]] = 1
+        return quota
+    rest, spare = sizes - present, budget - present.sum()
+    share = rest * spare / rest.sum()
+    quota = np.floor(share).astype(np.int64)
+    quota[np.argsort(quota - share, kind="stable")[:spare - quota.sum()]] += 1
+    return present + quota
+
+
+def _as_float(series: pd.Series) -> np.ndarray:
+    if pd.api.types.is_datetime64_any_dtype(series) or pd.api.types.is_timedelta64_dtype(series):
+        return series.to_numpy().view(np.int64).astype(np.float64)
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        return series.to_numpy(dtype=np.float64, na_value=np.nan)
+    return pd.factorize(series, sort=True)[0].astype(np.float64)
+
+
+def lttb(x: np.ndarray, y: np.ndarray, n: int) -> np.ndarray:
+    """
+    Positions of the `n` points kept by Largest-Triangle-Three-Buckets
+    (Steinarsson, 2013) for a series sorted by `x`: the first and last
+    points, plus from each of n - 2 equal buckets the point forming the
+    largest triangle with the previously kept point and the next bucket's
+    average.
+    """
+    size = len(x)
+    if n >= size:
+        return np.arange(size)
+    if n < 3:
+        return np.array([0, size - 1][:n], dtype=np.int64)
+
+    edges = np.linspace(1, size - 1, n - 1).astype(np.int64)
+    picked = np.empty(n, dtype=np.int64)
+    picked[0], picked[-1] = 0, size - 1
+    a = 0
+    for i in range(n - 2):
+        lo, hi = edges[i], edges[i + 1]
+        if i == n - 3:
+            cx, cy = x[-1], y[-1]
+        else:
+            cx, cy = x[hi:edges[i + 2]].mean(), y[hi:edges[i + 2]].mean()
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(np.argmax(area))
+        picked[i + 1] = a
+    return picked
+
+
+def _line_sample(data, x, y, groups, budget):
+    data = data.dropna(subset=[x, y])
+    if data.duplicated(subset=groups + [x]).any():
+        # lineplot draws the mean (and CI) of the rows sharing an x; LTTB
+        # would keep the extreme ones and bias it, a uniform sample does not
+        return _stratified_sample(data, [x, y], groups, budget, keep_outliers=False)
+    grouped = [g for _, g in data.groupby(groups, observed=True, sort=False)] if groups else [data]
+    quotas = _allocate([len(g) for g in grouped], budget)
+    kept = []
+    for group, quota in zip(grouped, quotas):
+        group = group.sort_values(x, kind="stable")
+        kept.append(group.index.to_numpy()[lttb(_as_float(group[x]), _as_float(group[y]), int(quota))])
+    return data.loc[np.concatenate(kept)], {"method": "lttb", "rows": len(data)}
+
+
+def _outlier_order(values: np.ndarray) -> np.ndarray:
+    """Per row, how far outside the Tukey fences of its column it lies, in
+    IQRs (0 inside); the largest over all columns."""
+    score = np.zeros(len(values))
+    for column in values.T:
+        q1, q3 = np.nanpercentile(column, [25, 75]) if np.isfinite(column).any() else (0.0, 0.0)
+        iqr = (q3 - q1) or 1.0
+        distance = np.maximum(q1 - 1.5 * iqr - column, column - q3 - 1.5 * iqr) / iqr
+        score = np.fmax(score, np.where(distance > 0, distance, 0))
+    return score
+
+
+def _stratified_sample(data, columns, strata, budget, keep_outliers: bool = True):
+    data = data.dropna(subset=columns)
+    numeric = [
+        c for c in columns
+        if pd.api.types.is_numeric_dtype(data[c]) and not pd.api.types.is_bool_dtype(data[c])
+    ]
+    grouped = [g for _, g in data.groupby(strata, observed=True, sort=False)] if strata else [data]
+    quotas = _allocate([len(g) for g in grouped], budget)
+    rng = np.random.default_rng(SEED)
+    kept, outliers = [], 0
+    for group, quota in zip(grouped, quotas):
+        index = group.index.to_numpy()
+        if quota >= len(group):
+            kept.append(index)
+            continue
+        # the most extreme points first (up to OUTLIER_SHARE of the quota),
+        # then a uniform sample of the rest
+        if keep_outliers and numeric:
+            score = _outlier_order(np.column_stack([_as_float(group[c]) for c in numeric]))
+        else:
+            score = np.zeros(len(group))
+        extreme = np.flatnonzero(score > 0)
+        extreme = extreme[np.argsort(-score[extreme], kind="stable")][:int(quota * OUTLIER_SHARE)]
+        rest = np.setdiff1d(np.arange(len(group)), extreme, assume_unique=True)
+        chosen = np.concatenate([extreme, rng.choice(rest, quota - len(extreme), replace=False)])
+        kept.append(index[np.sort(chosen)])
+        outliers += len(extreme)
+    return data.loc[np.concatenate(kept)], {"method": "stratified", "rows": len(data), "outliers": outliers}
+
+
+def downsample(data: pd.DataFrame, chart: str, x=None, y=None, hue=None, style=None, max_points: int = None, **_):
+    """
+    Thin `data` to the point budget of `chart` (`max_points`, or the
+    default from POINT_BUDGETS). Returns (frame, sampling), where sampling
+    is None when every row is drawn, otherwise
+
+        {"method": "lttb" | "stratified", "rows": <rows>, "points": <kept>,
+         "budget": <budget>, "outliers": <kept outliers (stratified)>}
+
+    Lines keep their shape through LTTB per hue/style line; when a line has
+    several rows per x (which lineplot averages), a uniform sample per line
+    is drawn instead. Scatter, strip and swarm keep every hue level (and
+    category) in proportion, with points beyond the Tukey fences kept first.
+    """
+    budget = max_points or POINT_BUDGETS.get(chart)
+    if budget is None or len(data) <= budget or isinstance(y, list) or isinstance(x, list):
+        return data, None
+    if any(c is not None and c not in data.columns for c in (x, y, hue, style)):
+        return data, None  # left for plot_chart to report
+
+    columns = [c for c in (x, y) if c is not None]
+    if chart == "line":
+        sampled, sampling = _line_sample(data, x, y, [c for c in (hue, style) if c is not None], budget)
+    else:
+        # strip/swarm draw one strip per category, so categories are strata too
+        categorical = [
+            c for c in columns
+            if chart != "scatter" and not (pd.api.types.is_numeric_dtype(data[c]) and not pd.api.types.is_bool_dtype(data[c]))
+        ]
+        strata = list(dict.fromkeys(categorical + ([hue] if hue is not None else [])))
+        sampled, sampling = _stratified_sample(data, columns, strata, budget)
+
+    if len(sampled) == sampling["rows"]:
+        return data, None
+    return sampled, {**sampling, "points": len(sampled), "budget": budget}
+
+
+def describe(sampling: dict) -> str:
+    text = f"{sampling['points']:,} of {sampling['rows']:,} points drawn ({sampling['method']} sampling"
+    if sampling.get("outliers"):
+        text += f", {sampling['outliers']:,} outliers kept"
+    return text + ")"
@@ -0,0 +1,312 @@
+import base64
+import numpy as np
+import pandas as pd
+
+# Mergeable, fixed-size summaries of a column for the approximate mode of
+# /summary, /column-info and /stats. Each sketch can be updated chunk by
+# chunk (e.g. per CSV block during ingestion) and two sketches of disjoint
+# parts of a column merge into the sketch of the whole column.
+#
+# Sketches are stored as JSON (see state/from_state): numeric arrays as base64 of
+# their raw bytes, the text sample as a plain list, and the random
+# generators' state, so a stored sketch continues exactly where it left off.
+
+HLL_PRECISION = 14      # 2^14 registers: ~0.8% relative standard error
+KLL_K = 200             # ~1.3% normalised rank error
+RESERVOIR_SIZE = 1000
+SEED = 0                # sketches of the same data are identical from run to run
+
+
+def hash_values(values) -> np.ndarray:
+    """64-bit hashes of a 1-D array of non-missing values."""
+    return pd.util.hash_array(np.asarray(values))
+
+
+def _pack(array: np.ndarray) -> dict:
+    array = np.ascontiguousarray(array)
+    return {"dtype": array.dtype.str, "data": base64.b64encode(array.tobytes()).decode()}
+
+
+def _unpack(packed: dict) -> np.ndarray:
+    # only plain numeric dtypes: frombuffer refuses object arrays
+    return np.frombuffer(base64.b64decode(packed["data"]), dtype=np.dtype(packed["dtype"])).copy()
+
+
+def _rng(state: dict = None, seed: int = SEED) -> np.random.Generator:
+    rng = np.random.default_rng(seed)
+    if state is not None:
+        rng.bit_generator.state = state
+    return rng
+
+
+def _bit_length(x: np.ndarray) -> np.ndarray:
+    # exact for uint64: each 32-bit half fits a float64 mantissa
+    hi = (x >> np.uint64(32)).astype(np.float64)
+    lo = (x & np.uint64(0xFFFFFFFF)).astype(np.float64)
+    return np.where(hi > 0, np.frexp(hi)[1] + 32, np.frexp(lo)[1])
+
+
+class HyperLogLog:
+    """Distinct-count estimate with relative standard error 1.04 / sqrt(2^p)."""
+
+    def __init__(self, p: int = HLL_PRECISION):
+        self.p = p
+        self.registers = np.zeros(1 << p, dtype=np.uint8)
+
+    @property
+    def error(self) -> float:
+        return 1.04 / np.sqrt(len(self.registers))
+
+    def update(self, hashes: np.ndarray):
+        if len(hashes) == 0:
+            return
+        hashes = hashes.astype(np.uint64, copy=False)
+        index = (hashes >> np.uint64(64 - self.p)).astype(np.int64)
+        rest = (hashes << np.uint64(self.p)) | np.uint64(1 << (self.p - 1))  # sentinel bounds the run
+        rank = (65 - _bit_length(rest)).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def merge(self, other: "HyperLogLog"):
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def state(self) -> dict:
+        return {"p": self.p, "registers": _pack(self.registers)}
+
+    @classmethod
+    def from_state(cls, state: dict) -> "HyperLogLog":
+        hll = cls(state["p"])
+        hll.registers = _unpack(state["registers"]).astype(np.uint8, copy=False)
+        return hll
+
+    def estimate(self) -> int:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and zeros:
+            raw = m * np.log(m / zeros)  # linear counting for small cardinalities
+        return int(round(raw))
+
+
+class KLL:
+    """Quantile sketch (Karnin, Lang, Liberty): a stack of compactors where
+    level h holds items of weight 2^h."""
+
+    def __init__(self, k: int = KLL_K, seed: int = SEED):
+        self.k = k
+        self.levels = [np.empty(0)]
+        self._rng = _rng(seed=seed)
+
+    @property
+    def rank_error(self) -> float:
+        # empirical bound for a single quantile query (Apache DataSketches)
+        return 2.296 / self.k ** 0.9723
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - level - 1
+        return max(2, int(np.ceil(self.k * (2 / 3) ** depth)))
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                keep = items[-1:] if len(items) % 2 else items[:0]
+                paired = items[:len(items) - len(keep)]
+                promoted = paired[self._rng.integers(2)::2]
+                self.levels[level] = keep
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            level += 1
+
+    def update(self, values: np.ndarray):
+        if len(values):
+            self.levels[0] = np.concatenate([self.levels[0], np.asarray(values, dtype=np.float64)])
+            self._compress()
+
+    def merge(self, other: "KLL"):
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self._compress()
+
+    def state(self) -> dict:
+        return {"k": self.k, "levels": [_pack(items) for items in self.levels],
+                "rng": self._rng.bit_generator.state}
+
+    @classmethod
+    def from_state(cls, state: dict) -> "KLL":
+        kll = cls(state["k"])
+        kll.levels = [_unpack(items).astype(np.float64, copy=False) for items in state["levels"]]
+        kll._rng = _rng(state["rng"])
+        return kll
+
+    def quantiles(self, qs) -> np.ndarray:
+        values = np.concatenate(self.levels)
+        if len(values) == 0:
+            return np.full(len(qs), np.nan)
+        weights = np.concatenate([np.full(len(items), 2.0 ** h) for h, items in enumerate(self.levels)])
+        order = np.argsort(values, kind="stable")
+        values, cumulative = values[order], np.cumsum(weights[order])
+        positions = np.searchsorted(cumulative, np.asarray(qs) * cumulative[-1], side="left")
+        return values[np.minimum(positions, len(values) - 1)]
+
+
+class Reservoir:
+    """Uniform sample of at most `size` values: each value gets a random
+    priority and the lowest priorities are kept, so merging is just keeping
+    the lowest priorities of both."""
+
+    def __init__(self, size: int = RESERVOIR_SIZE, seed: int = SEED):
+        self.size = size
+        self.priorities = np.empty(0)
+        self.values = np.empty(0, dtype=object)
+        self._rng = _rng(seed=seed)
+
+    def _keep(self, priorities, values):
+        if len(priorities) > self.size:
+            best = np.argpartition(priorities, self.size)[:self.size]
+            priorities, values = priorities[best], values[best]
+        self.priorities, self.values = priorities, values
+
+    def update(self, values: np.ndarray):
+        priorities = self._rng.random(len(values))
+        if len(values) > self.size:
+            best = np.argpartition(priorities, self.size)[:self.size]
+            priorities, values = priorities[best], np.asarray(values)[best]
+        self._keep(
+            np.concatenate([self.priorities, priorities]),
+            np.concatenate([self.values, np.asarray(values, dtype=object)]),
+        )
+
+    def merge(self, other: "Reservoir"):
+        self._keep(
+            np.concatenate([self.priorities, other.priorities]),
+            np.concatenate([self.values, other.values]),
+        )
+
+    def state(self) -> dict:
+        # numpy scalars as Python ones; anything JSON has no type for as text
+        values = [v.item() if isinstance(v, np.generic) else v for v in self.values]
+        return {"size": self.size, "priorities": _pack(self.priorities),
+                "values": [v if v is None or isinstance(v, (str, int, float, bool)) else str(v) for v in values],
+                "rng": self._rng.bit_generator.state}
+
+    @classmethod
+    def from_state(cls, state: dict) -> "Reservoir":
+        reservoir = cls(state["size"])
+        reservoir.priorities = _unpack(state["priorities"]).astype(np.float64, copy=False)
+        reservoir.values = np.empty(len(state["values"]), dtype=object)
+        reservoir.values[:] = state["values"]
+        reservoir._rng = _rng(state["rng"])
+        return reservoir
+
+
+class ColumnSketch:
+    """Everything the approximate summaries need about one column. Counts,
+    mean, std, min and max are exact; distinct count, quantiles and the
+    type-inference sample are sketched."""
+
+    def __init__(self):
+        self.rows = 0
+        self.nulls = 0
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.nan
+        self.max = np.nan
+        self.numeric = None
+        self.hll = HyperLogLog()
+        self.kll = KLL()
+        self.sample = Reservoir()
+
+    def _add_moments(self, count: int, mean: float, m2: float):
+        # Chan et al. parallel update of mean and sum of squared deviations
+        if count == 0:
+            return
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+
+    def update(self, series: pd.Series):
+        dtype = series.dtype
+        if self.numeric is None:
+            self.numeric = pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)
+        self.rows += len(series)
+
+        if isinstance(dtype, pd.CategoricalDtype):
+            codes = series.cat.codes.to_numpy()
+            codes = codes[codes >= 0]
+            self.nulls += len(series) - len(codes)
+            categories = np.asarray(series.cat.categories, dtype=object)
+            self.hll.update(hash_values(categories)[codes] if len(categories) else np.empty(0, np.uint64))
+            picked = self.sample._rng.choice(codes, min(len(codes), self.sample.size), replace=False)
+            self.sample.update(categories[picked])
+            self.count += len(codes)
+            return
+
+        values = series.dropna().to_numpy()
+        self.nulls += len(series) - len(values)
+        if len(values):
+            self.hll.update(hash_values(values))
+        if not self.numeric:
+            self.sample.update(values)
+            self.count += len(values)
+            return
+
+        values = values.astype(np.float64)
+        if len(values):
+            mean = values.mean()
+            self._add_moments(len(values), mean, float(((values - mean) ** 2).sum()))
+            self.min = np.nanmin([self.min, values.min()])
+            self.max = np.nanmax([self.max, values.max()])
+            self.kll.update(values)
+
+    def merge(self, other: "ColumnSketch"):
+        if self.numeric is None:
+            self.numeric = other.numeric
+        self.rows += other.rows
+        self.nulls += other.nulls
+        if self.numeric:
+            self._add_moments(other.count, other.mean, other.m2)
+            self.min = np.nanmin([self.min, other.min])
+            self.max = np.nanmax([self.max, other.max])
+        else:
+            self.count += other.count
+        self.hll.merge(other.hll)
+        self.kll.merge(other.kll)
+        self.sample.merge(other.sample)
+
+    @property
+    def std(self) -> float:
+        return float(np.sqrt(self.m2 / (self.count - 1))) if self.count > 1 else np.nan
+
+    _SCALARS = ("rows", "nulls", "count", "mean", "m2", "min", "max", "numeric")
+
+    def state(self) -> dict:
+        scalars = {name: getattr(self, name) for name in self._SCALARS}
+        scalars = {k: v.item() if isinstance(v, np.generic) else v for k, v in scalars.items()}
+        return {**scalars, "hll": self.hll.state(), "kll": self.kll.state(), "sample": self.sample.state()}
+
+    @classmethod
+    def from_state(cls, state: dict) -> "ColumnSketch":
+        sketch = cls()
+        for name in cls._SCALARS:
+            setattr(sketch, name, state[name])
+        sketch.hll = HyperLogLog.from_state(state["hll"])
+        sketch.kll = KLL.from_state(state["kll"])
+        sketch.sample = Reservoir.from_state(state["sample"])
+        return sketch
+
+
+def sketch_series(series: pd.Series, chunk_rows: int = 1_000_000) -> ColumnSketch:
+    """Sketch a whole column, `chunk_rows` rows at a time."""
+    sketch = ColumnSketch()
+    for start in range(0, max(len(series), 1), chunk_rows):
+        sketch.update(series.iloc[start:start + chunk_rows])
+    return sketch
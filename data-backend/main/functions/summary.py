@@ -13,93 +13,270 @@ def df_summary_info(df: pd.DataFrame) -> dict:
     }
 
 
-def columns_info(df: pd.DataFrame) -> dict:
-    columnTypes = []
-    LONG_TEXT_THRESHOLD = 15  
+# Numeric columns are profiled in blocks of at most this many cells (and
+# BLOCK_COLUMNS columns), so the float64 copy of a block stays small.
+BLOCK_CELLS = 1 << 23
+BLOCK_COLUMNS = 64
 
-    for col in df.columns:
-        dtype = df[col].dtype
-        col_type = None
-
-        if np.issubdtype(dtype, np.number):
-            col_type = "number"
-
-        elif np.issubdtype(dtype, np.datetime64):
-            col_type = "datetime"
-
-        elif df[col].dtype == object or pd.api.types.is_string_dtype(dtype):
-            non_null = df[col].dropna().astype(str)
-            max_len = non_null.map(len).max() if not non_null.empty else 0
-
-            # Try detecting datetime strings
-            if not non_null.empty:
-                sample = non_null.sample(min(len(non_null), 20), random_state=42)
-                with warnings.catch_warnings():
-                    warnings.simplefilter("ignore")  # suppress parsing warnings
-                    parsed = pd.to_datetime(sample, errors='coerce', infer_datetime_format=True)
-
-                # If most values parsed successfully, it's datetime
-                valid_ratio = parsed.notna().mean()
-                if valid_ratio > 0.8:  # adjust threshold if needed
-                    col_type = "datetime"
-                else:
-                    col_type = "text" if max_len > LONG_TEXT_THRESHOLD else "categorical"
-            else:
-                col_type = "categorical"
 
+def numeric_profile(df: pd.DataFrame, columns=None) -> dict:
+    """
+    count, nulls, unique, mean, std, min, q1, median, q3 and max of the
+    numeric `columns` of `df` (default: all), as arrays aligned with `columns`.
+
+    Each block of columns is copied once to a 2-D float array with one
+    column per row (so every column is contiguous) and sorted once (NaN sorts
+    last); the order statistics and the distinct count are then read off the
+    sorted block for all columns at once, instead of several scans per column.
+    """
+    names = list(df.columns if columns is None else columns)
+    rows = len(df)
+    keys = ["count", "nulls", "unique", "mean", "std", "min", "q1", "median", "q3", "max"]
+    out = {k: np.full(len(names), np.nan) for k in keys}
+    step = max(1, min(BLOCK_COLUMNS, BLOCK_CELLS // max(rows, 1)))
+    for start in range(0, len(names), step):
+        cols = slice(start, start + step)
+        block = df[names[cols]].to_numpy(dtype=np.float64, na_value=np.nan)
+        block = np.array(block.T, order="C")  # always a private copy: sorted in place
+        width = block.shape[0]
+        block.sort(axis=1)
+        count = rows - np.isnan(block).sum(axis=1)
+        out["count"][cols] = count
+        out["nulls"][cols] = rows - count
+        if rows == 0:
+            out["unique"][cols] = 0
+            continue
+
+        present = np.arange(rows) < count[:, None]
+        changes = (block[:, 1:] != block[:, :-1]).sum(axis=1, where=present[:, 1:])
+        out["unique"][cols] = np.where(count > 0, changes + 1, 0)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = block.sum(axis=1, where=present) / count
+            deviations = block - mean[:, None]
+            squares = np.square(deviations, out=deviations).sum(axis=1, where=present)
+            out["mean"][cols] = mean
+            out["std"][cols] = np.where(count > 1, np.sqrt(squares / (count - 1)), np.nan)
+
+        # linear interpolation between closest ranks, as Series.quantile
+        index = np.arange(width)
+        last = np.maximum(count - 1, 0)
+        for name, q in (("min", 0.0), ("q1", 0.25), ("median", 0.5), ("q3", 0.75), ("max", 1.0)):
+            pos = q * last
+            lo = np.floor(pos).astype(np.int64)
+            hi = np.ceil(pos).astype(np.int64)
+            low, high = block[index, lo], block[index, hi]
+            value = low + (high - low) * (pos - lo)
+            out[name][cols] = np.where(count > 0, value, np.nan)
+    return out
+
+
+STAT_KEYS = ("mean", "median", "std", "min", "max", "q1", "q3")
+LONG_TEXT_THRESHOLD = 15
+
+
+def _numeric_columns(df: pd.DataFrame) -> list:
+    return [
+        col for col in df.columns
+        if pd.api.types.is_numeric_dtype(df[col].dtype) and not pd.api.types.is_bool_dtype(df[col].dtype)
+    ]
+
+
+def _column_type(series: pd.Series) -> str:
+    dtype = series.dtype
+
+    if isinstance(dtype, pd.CategoricalDtype):
+        return "categorical"
+
+    if pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype):
+        return "number"
+
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return "datetime"
+
+    if dtype == object or pd.api.types.is_string_dtype(dtype):
+        non_null = series.dropna().astype(str)
+        if non_null.empty:
+            return "categorical"
+        max_len = non_null.map(len).max()
+
+        # Try detecting datetime strings
+        sample = non_null.sample(min(len(non_null), 20), random_state=42)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")  # suppress parsing warnings
+            parsed = pd.to_datetime(sample, errors='coerce', infer_datetime_format=True)
+
+        # If most values parsed successfully, it's datetime
+        valid_ratio = parsed.notna().mean()
+        if valid_ratio > 0.8:  # adjust threshold if needed
+            return "datetime"
+        return "text" if max_len > LONG_TEXT_THRESHOLD else "categorical"
+
+    return str(dtype)
+
+
+def column_profiles(df: pd.DataFrame, columns=None) -> dict:
+    """
+    Everything /summary, /column-info and /stats report about each column,
+    computed independently per column so profiles can be cached and
+    recomputed one column at a time:
+
+        {col: {"type", "nulls", "unique", "stats": {"count", "mean", ...} or None}}
+
+    `stats` is only set for numeric columns and holds unrounded values.
+    """
+    columns = list(df.columns if columns is None else columns)
+    numeric = _numeric_columns(df[columns]) if columns else []
+    profile = numeric_profile(df, numeric)
+    profiles = {}
+    for i, col in enumerate(numeric):
+        profiles[col] = {
+            "type": "number",
+            "nulls": int(profile["nulls"][i]),
+            "unique": int(profile["unique"][i]),
+            "stats": {"count": int(profile["count"][i]), **{k: float(profile[k][i]) for k in STAT_KEYS}},
+        }
+
+    for col in columns:
+        if col in profiles:
+            continue
+        series = df[col]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            codes = series.cat.codes.to_numpy()
+            used = np.bincount(codes[codes >= 0], minlength=len(series.cat.categories))
+            nulls, unique = int((codes < 0).sum()), int((used > 0).sum())
         else:
-            col_type = str(dtype)
+            nulls, unique = int(series.isna().sum()), int(series.nunique())
+        profiles[col] = {"type": _column_type(series), "nulls": nulls, "unique": unique, "stats": None}
 
-        columnTypes.append({
-            "name": col,
-            "type": col_type,
-            "nulls": int(df[col].isna().sum()),
-            "unique": int(df[col].nunique())
-        })
+    return {col: profiles[col] for col in columns}
 
-    return columnTypes
 
+def sketch_profiles(sketches: dict, dtypes: dict) -> dict:
+    """
+    Approximate column profiles, in the layout of `column_profiles`, from
+    the ColumnSketch of each column (see functions/sketches.py) and its dtype
+    string. Null counts, count, mean, std, min and max are exact; `unique`
+    and the quartiles are estimates whose error bounds are under "error",
+    and text columns are typed from the sketch's sample.
+    """
+    profiles = {}
+    for col, sketch in sketches.items():
+        dtype = pd.api.types.pandas_dtype(dtypes[col])
+        sample = pd.Series(sketch.sample.values if dtype == object else [], dtype=dtype)
+        profile = {
+            "type": _column_type(sample),
+            "nulls": int(sketch.nulls),
+            "unique": sketch.hll.estimate(),
+            "stats": None,
+            "error": {"unique": float(sketch.hll.error)},
+        }
+        if sketch.numeric:
+            q1, median, q3 = sketch.kll.quantiles([0.25, 0.5, 0.75])
+            profile["stats"] = {
+                "count": int(sketch.count), "mean": float(sketch.mean) if sketch.count else np.nan,
+                "median": float(median), "std": sketch.std, "min": float(sketch.min),
+                "max": float(sketch.max), "q1": float(q1), "q3": float(q3),
+            }
+            profile["error"]["quantiles"] = float(sketch.kll.rank_error)
+        profiles[col] = profile
+    return profiles
 
 
-def stats(df:pd.DataFrame)->list[dict]:
+def summary_from_profiles(profiles: dict, rows: int) -> dict:
+    total_missing = sum(p["nulls"] for p in profiles.values())
+    total_cells = rows * len(profiles)
+
+    return {
+        "rows": rows,
+        "columns": len(profiles),
+        "missing_percentage": round((total_missing / total_cells) * 100, 2)*100
+    }
+
+
+def columns_info_from_profiles(profiles: dict) -> list[dict]:
+    info = []
+    for col, p in profiles.items():
+        item = {"name": col, "type": p["type"], "nulls": p["nulls"], "unique": p["unique"]}
+        if "error" in p:
+            item["unique_error"] = p["error"]["unique"]  # relative standard error
+        info.append(item)
+    return info
+
+
+def stats_from_profiles(profiles: dict) -> list[dict]:
     stats_list=[]
-    for col in df.select_dtypes(include=[np.number]).columns:
-        stats_list.append({
+    for col, p in profiles.items():
+        if p["stats"] is None:
+            continue
+        item = {
             "name": col,
-            "count": int(df[col].count()),
-            "mean": float(round(df[col].mean(), 2)),
-            "median": float(round(df[col].median(), 2)),
-            "std": float(round(df[col].std(), 2)),
-            "min": float(round(df[col].min(), 2)),
-            "max": float(round(df[col].max(), 2)),
-            "q1": float(round(df[col].quantile(0.25), 2)),
-            "q3": float(round(df[col].quantile(0.75), 2)),
-        })
+            "count": p["stats"]["count"],
+            **{k: float(np.round(p["stats"][k], 2)) for k in STAT_KEYS},
+        }
+        if "error" in p:
+            item["rank_error"] = p["error"]["quantiles"]  # of median, q1 and q3
+        stats_list.append(item)
     return stats_list
 
 
-def unique_values(df: pd.DataFrame) -> list[dict]:
+def columns_info(df: pd.DataFrame) -> dict:
+    return columns_info_from_profiles(column_profiles(df))
+
+
+def stats(df:pd.DataFrame)->list[dict]:
+    return stats_from_profiles(column_profiles(df, _numeric_columns(df)))
+
+
+UNIQUE_LIMIT = 20
+UNIQUE_THRESHOLD = 20  # integer columns with more distinct values are not listed
+
+
+def value_counts(series: pd.Series):
+    """(labels, counts) of the distinct non-missing values, most frequent
+    first (ties in first-seen order), counted over categorical codes."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes, labels = series.cat.codes.to_numpy(), series.cat.categories
+    else:
+        codes, labels = pd.factorize(series, use_na_sentinel=True)
+    counts = np.bincount(codes[codes >= 0], minlength=len(labels))
+    order = np.argsort(-counts, kind="stable")
+    order = order[counts[order] > 0]
+    return np.asarray(labels)[order], counts[order]
+
+
+def _lists_values(series: pd.Series, total: int) -> bool:
+    dtype = series.dtype
+    if dtype == object or isinstance(dtype, pd.CategoricalDtype) or pd.api.types.is_bool_dtype(dtype):
+        return True
+    return pd.api.types.is_integer_dtype(dtype) and total <= UNIQUE_THRESHOLD
+
+
+def unique_values(df: pd.DataFrame, limit: int = UNIQUE_LIMIT, offset: int = 0,
+                  every_column: bool = False) -> list[dict]:
+    """
+    For each categorical-like column (or every column of `df` with
+    `every_column`), the values ranked `offset` to `offset + limit` by
+    frequency, with their counts and the total number of distinct values
+    (`more` tells whether any are left after this page).
+    `unique_values` stays a list of strings for existing clients.
+    """
     categorical_info = []
-    unique_threshold = 20
-    
+
     for col in df.columns:
-        if df[col].dtype == 'object':
-            values = df[col].dropna().unique().tolist()
-            categorical_info.append({
-                "column": col,
-                "unique_values": [str(v) for v in values]  # ✅ all string
-            })
-        elif pd.api.types.is_integer_dtype(df[col]) and df[col].nunique() <= unique_threshold:
-            values = df[col].dropna().unique().tolist()
-            categorical_info.append({
-                "column": col,
-                "unique_values": [str(v) for v in values]  # ✅ force string
-            })
-        elif pd.api.types.is_bool_dtype(df[col]):
-            values = df[col].dropna().unique().tolist()
-            categorical_info.append({
-                "column": col,
-                "unique_values": [str(v) for v in values]  # ✅ force string
-            })
-    
-    return categorical_info
\ No newline at end of file
+        if not (every_column or df[col].dtype == object or isinstance(df[col].dtype, pd.CategoricalDtype)
+                or pd.api.types.is_integer_dtype(df[col]) or pd.api.types.is_bool_dtype(df[col])):
+            continue
+        labels, counts = value_counts(df[col])
+        if not (every_column or _lists_values(df[col], len(labels))):
+            continue
+        page = slice(offset, offset + limit)
+        categorical_info.append({
+            "column": col,
+            "unique_values": [str(v) for v in labels[page]],
+            "counts": counts[page].tolist(),
+            "total_unique": len(labels),
+            "more": offset + limit < len(labels),
+        })
+
+    return categorical_info
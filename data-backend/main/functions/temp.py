@@ -82,17 +82,15 @@ def correlation_matrix(df, method="pearson"):
     if method not in ["pearson", "spearman", "kendall"]:
         raise ValueError("method must be 'pearson', 'spearman', or 'kendall'")
     
+    # served (cached) by GET /correlation, see callbacks/correlation.py
+    from main.functions.correlation import triplets
+
     corr_matrix = df.corr(method=method, numeric_only=True)
     columns = corr_matrix.columns.tolist()
-    triplets = [
-        [i, j, float(round(corr_matrix.iloc[i, j], 2))]
-        for i in range(len(columns))
-        for j in range(len(columns))
-    ]
     
     return {
         "columns": columns,
-        "data": triplets
+        "data": triplets(corr_matrix.to_numpy())
     }
 
 # Example usage:
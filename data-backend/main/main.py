@@ -4,18 +4,30 @@ from socketio import ASGIApp
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 
-from .routes import general,preprocessing,charts
+from .routes import general,preprocessing,charts,export
 
 
 from .sockets.events import sio
 from .config.db_config import connect_to_mongo
 from .utils.errors import AppException, app_exception_handler
-from .middleware.response import ResponseMiddleware
+from .utils.etag import NotModified, not_modified_handler
+from .middleware.response import ResponseMiddleware, EnvelopeJSONResponse
+from .utils.static_files import ImmutableStaticFiles
 
 from .redis_utils.pubsub import start_listener
 from .callbacks.df_manager import refresh_df
+from .callbacks.memo import invalidate_memo
+from .callbacks.chart_pool import start_pool, shutdown_pool
+from .callbacks.chart_cache import CHART_DIR
 
 import os
+import pandas as pd
+
+# Cached DataFrames are handed to every request without copying (see
+# callbacks/df_manager.py); copy-on-write keeps a request's changes to its
+# frame from reaching the cache or other requests. Set once, for the whole
+# process, before any request runs.
+pd.set_option("mode.copy_on_write", True)
 
 # absolute path to the project root
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -27,16 +39,21 @@ STATIC_DIR = os.path.join(BASE_DIR, "static")
 # make sure the folder exists
 os.makedirs(STATIC_DIR, exist_ok=True)
 
-fastapi_app = FastAPI()
+fastapi_app = FastAPI(default_response_class=EnvelopeJSONResponse)
+# hashed chart files never change, so they get immutable cache headers
+os.makedirs(CHART_DIR, exist_ok=True)
+fastapi_app.mount("/static/charts", ImmutableStaticFiles(directory=CHART_DIR), name="charts")
 fastapi_app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
 
 #Routeres
 fastapi_app.include_router(general.router)
 fastapi_app.include_router(preprocessing.router)
 fastapi_app.include_router(charts.router)
+fastapi_app.include_router(export.router)
 
 
 fastapi_app.add_exception_handler(AppException, app_exception_handler)
+fastapi_app.add_exception_handler(NotModified, not_modified_handler)
 
 fastapi_app.add_middleware(ResponseMiddleware)
 
@@ -50,6 +67,7 @@ fastapi_app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],   
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Chart-Sampling", "X-Chart-Render"],
 )
 
 socket_app = ASGIApp(sio, other_asgi_app=fastapi_app)
@@ -61,12 +79,19 @@ socket_app = ASGIApp(sio, other_asgi_app=fastapi_app)
     
 @fastapi_app.on_event("startup")
 async def startup_event():
+    start_pool()
     try:
         await connect_to_mongo()
         start_listener(refresh_df)
+        start_listener(invalidate_memo)
     except Exception as e:
         print(f"⚠️ Mongo not available at startup: {e}")
 
+
+@fastapi_app.on_event("shutdown")
+async def shutdown_event():
+    shutdown_pool()
+
 app = socket_app
 
 if __name__ == "__main__":
@@ -1,51 +1,111 @@
-from fastapi import Request
+from http import HTTPStatus
 from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
-from typing import Any, Dict
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
-import json
+import orjson
 from pydantic import BaseModel
 from typing import Optional, Any
+from main.utils.df_response import ENVELOPE_HEADER, ORJSON_OPTIONS
 
 class APIResponse(BaseModel):
     success: bool
     data: Optional[Any] = None
     message: Optional[str] = None
 
-class ResponseMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        try:
-            response = await call_next(request)
-            if request.url.path.startswith("/static"):
-                return await call_next(request)
-            if isinstance(response, JSONResponse):
-                return response  
-
-            # Read raw body
-            body = b"".join([chunk async for chunk in response.body_iterator])
-            try:
-                payload = json.loads(body.decode()) if body else None
-            except Exception:
-                payload = body.decode() if body else None
-
-            # --- Handle custom message convention ---
-            message = "OK"
-            data = payload
-
-            # If payload is dict with 'data' and 'message', extract them
-            if isinstance(payload, dict):
-                if "data" in payload:
-                    data = payload["data"]
-                if "message" in payload:
-                    message = payload["message"]
-
-            return JSONResponse(
-                content=APIResponse(success=True, data=data, message=message).dict(),
-                status_code=response.status_code,
-            )
 
+class EnvelopeJSONResponse(JSONResponse):
+    """
+    Default response class: wraps route results in the API envelope while
+    encoding, so the body is serialised exactly once.
+
+    Keeps the route convention: a dict with 'data' and/or 'message' keys
+    has them lifted into the envelope, anything else becomes `data`.
+    """
+
+    def __init__(self, content: Any = None, status_code: int = 200, headers=None, **kwargs):
+        super().__init__(content, status_code, {**(headers or {}), ENVELOPE_HEADER: "1"}, **kwargs)
+
+    def render(self, content: Any) -> bytes:
+        message = "OK"
+        data = content
+        if isinstance(content, dict):
+            if "data" in content:
+                data = content["data"]
+            if "message" in content:
+                message = content["message"]
+        return orjson.dumps(
+            {"success": self.status_code < 400, "data": data, "message": message},
+            option=ORJSON_OPTIONS,
+            default=str,
+        )
+
+
+def _phrase(status: int) -> str:
+    try:
+        return HTTPStatus(status).phrase
+    except ValueError:  # not a standard status code
+        return "OK"
+
+
+class ResponseMiddleware:
+    """
+    Pure ASGI envelope middleware. It never buffers or re-parses a body:
+      - responses marked with the envelope header are passed on (header removed)
+      - other JSON responses (e.g. FastAPI's own 404/422 bodies) are wrapped
+        by streaming an envelope prefix and suffix around the original chunks
+      - static files, streams and non-JSON bodies pass through untouched
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["path"].startswith("/static"):
+            await self.app(scope, receive, send)
+            return
+
+        state = {"started": False, "suffix": None}
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start":
+                state["started"] = True
+                headers = MutableHeaders(scope=message)
+                status = message["status"]
+                if ENVELOPE_HEADER in headers:
+                    del headers[ENVELOPE_HEADER]
+                elif (
+                    headers.get("content-type", "").startswith("application/json")
+                    and status not in (204, 304)
+                    and scope["method"] != "HEAD"
+                ):
+                    ok = status < 400
+                    text = "OK" if ok else _phrase(status)
+                    prefix = b'{"success":' + (b"true" if ok else b"false") + b',"data":'
+                    state["suffix"] = b',"message":' + orjson.dumps(text) + b"}"
+                    if "content-length" in headers:
+                        extra = len(prefix) + len(state["suffix"])
+                        headers["content-length"] = str(int(headers["content-length"]) + extra)
+                    await send(message)
+                    await send({"type": "http.response.body", "body": prefix, "more_body": True})
+                    return
+                await send(message)
+
+            elif message["type"] == "http.response.body" and state["suffix"] is not None:
+                more_body = message.get("more_body", False)
+                await send({**message, "more_body": True})
+                if not more_body:
+                    await send({"type": "http.response.body", "body": state["suffix"], "more_body": False})
+            else:
+                await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
         except Exception as e:
-            return JSONResponse(
+            if state["started"]:
+                raise
+            response = JSONResponse(
                 content=APIResponse(success=False, data=None, message=str(e)).dict(),
                 status_code=500,
             )
+            await response(scope, receive, send)
@@ -0,0 +1,81 @@
+import os
+import pickle
+import pandas as pd
+
+try:
+    import pyarrow as pa
+except ImportError:  # pyarrow is optional, pickle still works without it
+    pa = None
+
+# Every payload written by a codec starts with this header so readers know
+# how to decode it. Payloads without it are legacy raw pickles.
+MAGIC = b"DFC1"
+
+DEFAULT_CODEC = os.getenv("DF_CODEC", "arrow")
+
+
+class PickleCodec:
+    name = "pickle"
+
+    def encode(self, df: pd.DataFrame) -> bytes:
+        return pickle.dumps(df, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def decode(self, payload) -> pd.DataFrame:
+        return pickle.loads(payload)
+
+
+class ArrowCodec:
+    """Arrow IPC stream format. Decoding wraps the payload without copying it,
+    so numeric columns without nulls are handed to pandas zero-copy."""
+    name = "arrow"
+
+    def encode(self, df: pd.DataFrame) -> bytes:
+        table = pa.Table.from_pandas(df, preserve_index=None)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+
+    def decode(self, payload) -> pd.DataFrame:
+        table = pa.ipc.open_stream(pa.py_buffer(payload)).read_all()
+        return table.to_pandas(split_blocks=True)
+
+
+CODECS = {PickleCodec.name: PickleCodec()}
+if pa is not None:
+    CODECS[ArrowCodec.name] = ArrowCodec()
+
+
+def get_codec(name: str = None):
+    """Return the codec registered under `name`, falling back to pickle."""
+    return CODECS.get(name or DEFAULT_CODEC, CODECS["pickle"])
+
+
+def encode_df(df: pd.DataFrame, codec: str = None) -> bytes:
+    """Encode a DataFrame with the configured codec and prefix it with a header.
+
+    Frames Arrow cannot represent (e.g. mixed-type object columns) are stored
+    with pickle instead so writes never fail because of the codec choice."""
+    chosen = get_codec(codec)
+    try:
+        body = chosen.encode(df)
+    except Exception:
+        if chosen.name == "pickle":
+            raise
+        chosen = CODECS["pickle"]
+        body = chosen.encode(df)
+    name = chosen.name.encode()
+    return MAGIC + bytes([len(name)]) + name + body
+
+
+def decode_df(payload: bytes) -> pd.DataFrame:
+    """Decode a payload written by `encode_df` (or a legacy raw pickle)."""
+    view = memoryview(payload)
+    if bytes(view[:len(MAGIC)]) != MAGIC:
+        return pickle.loads(payload)
+    start = len(MAGIC) + 1
+    end = start + view[len(MAGIC)]
+    name = bytes(view[start:end]).decode()
+    if name not in CODECS:
+        raise ValueError(f"Unknown DataFrame codec '{name}'")
+    return CODECS[name].decode(view[end:])
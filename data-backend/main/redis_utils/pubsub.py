@@ -1,31 +1,51 @@
 from main.utils.errors import AppException
 import threading
+import json
 import redis
 
 r = redis.Redis(host="localhost", port=6379, decode_responses=False)
 
 
-def listen_for_updates(callback):
-    """Listen for DF updates and run callback when received."""
+def listen_for_updates(callback, channels=("df_update",)):
+    """Listen for DF updates and run callback with each message payload."""
     try:
         pubsub = r.pubsub()
-        pubsub.subscribe("df_update")
+        pubsub.subscribe(*channels)
         for message in pubsub.listen():
             if message["type"] == "message":
-                callback()
+                try:
+                    callback(message["data"])
+                except Exception as e:
+                    # keep listening, the next get_df revalidates anyway
+                    print(f"[pubsub] update handler failed: {e}")
     except Exception as e:
         raise AppException("Failed to connect to Redis", extra=str(e), status_code=500)
 
 
-def start_listener(callback):
+def start_listener(callback, channels=("df_update",)):
     """Start the Pub/Sub listener in a background thread."""
-    t = threading.Thread(target=listen_for_updates, args=(callback,), daemon=True)
+    t = threading.Thread(target=listen_for_updates, args=(callback, channels), daemon=True)
     t.start()
 
 
-def notify_update(channel: str = "df_update"):
-    """Notify all workers that DF has been updated."""
+def notify_update(channel: str = "df_update", key: str = "main_df", version: int = 0, columns=None,
+                  generation: str = None):
+    """Notify all workers that `key` now has `version`. `columns` lists the
+    columns that changed, or is None when the whole dataset was rewritten;
+    `generation` is the manifest's generation nonce."""
     try:
-        r.publish("df_update", "refresh")
+        r.publish(channel, json.dumps({"key": key, "version": version, "columns": columns,
+                                       "generation": generation}))
     except Exception as e:
-        raise AppException("Failed to connect to Redis", extra=str(e), status_code=500)
\ No newline at end of file
+        raise AppException("Failed to connect to Redis", extra=str(e), status_code=500)
+
+
+def parse_update(message):
+    """Return the published update as a dict (key, version, columns, generation), or None
+    if the message predates versioning (e.g. the old plain "refresh")."""
+    try:
+        update = json.loads(message)
+        update["version"] = int(update["version"])
+        return update if "key" in update else None
+    except (TypeError, ValueError, KeyError):
+        return None
@@ -1,12 +1,20 @@
 
-from fastapi import APIRouter, Depends
+import asyncio
+import json
+from fastapi import APIRouter, Depends, Header, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 import pandas as pd
-from main.callbacks.df_manager import get_df, set_df
+from main.callbacks.df_manager import get_manifest, get_columns, dataset_key
+from main.callbacks.chart_pool import render_chart, RENDER_TIMEOUT, POOL_SIZE
+from main.callbacks.chart_push import start_push, cancel_push, owns_socket, preview_options, PREVIEW_TIMEOUT
+from main.callbacks.memo import memoize
+from main.callbacks import chart_cache
+from main.functions.chart_data import chart_spec
+from main.functions.sampling import describe
 from main.utils.errors import AppException
-from main.sockets.events import connected_clients
-from main.functions.charts import plot_chart
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Optional, List, Literal, Union
 
 
 class ChartRequest(BaseModel):                # expects tabular data (e.g., DataFrame-like JSON)
@@ -19,6 +27,14 @@ class ChartRequest(BaseModel):                # expects tabular data (e.g., Data
     kde: Optional[bool] = False               # whether to show KDE (for distributions)
     multiple: Optional[str] = None            # "layer", "stack", "dodge", etc. (for histplot)
     cols: Optional[int] = None                # number of columns (for facet grids)
+    output: Literal["png", "data"] = "png"    # "data": aggregated series instead of an image
+    max_points: Optional[int] = Field(None, ge=10)  # point budget (scatter/line/strip/swarm)
+    sid: Optional[str] = None                 # socket.io id: preview now, full chart pushed later
+
+
+class BatchChartRequest(ChartRequest):
+    x: Optional[Union[str, List[str]]] = None  # x-axis column(s): a chart per (x, y) pair
+    facet: bool = False                        # one figure with a panel per pair (`cols` per row)
 
 
 # data, chart, x=None, y=None, hue=None, style=None, size=None, kde=False, multiple=None, cols=None
@@ -26,15 +42,68 @@ class ChartRequest(BaseModel):                # expects tabular data (e.g., Data
 router = APIRouter(prefix="/chart")
 
 
+async def _chart_url(request: Request, key: str, manifest: dict, options: dict,
+                     timeout: float = RENDER_TIMEOUT, background: bool = False):
+    """(url, sampling) of the cached chart, rendering it first if needed."""
+    name = chart_cache.chart_name(key, manifest, options)
+    if chart_cache.lookup(name):
+        sampling = chart_cache.get_sampling(name)
+    else:
+        # a background render outlives the request, so it does not watch it
+        watch = None if background else request
+        _, sampling = await render_chart(key, options, watch, name=name, timeout=timeout)
+    return str(request.url_for("charts", path=f"{name}.png")), sampling
+
+
+async def _charts(request: Request, key: str, manifest: dict, options: dict, ys, **kwargs):
+    """(chart, sampling): a URL per y column (rendered in parallel), or a
+    single URL when there is no y."""
+    if ys:
+        results = await asyncio.gather(*[
+            _chart_url(request, key, manifest, {**options, "y": col}, **kwargs) for col in ys
+        ])
+        return [url for url, _ in results], [s for _, s in results]
+    return await _chart_url(request, key, manifest, {**options, "y": None}, **kwargs)
+
+
+def _sampling_note(sampling):
+    """Message describing the sampling applied, or None if nothing was."""
+    notes = [s for s in (sampling if isinstance(sampling, list) else [sampling]) if s]
+    return "; ".join(describe(s) for s in notes) if notes else None
+
+
+def _is_cached(key: str, manifest: dict, options: dict, ys) -> bool:
+    return all(
+        chart_cache.lookup(chart_cache.chart_name(key, manifest, {**options, "y": col}))
+        for col in (ys or [None])
+    )
+
+
+def _chart_data(key: str, options: dict) -> dict:
+    # only the columns the chart uses are loaded
+    columns = list(dict.fromkeys(c for c in (options["x"], options["y"], options["hue"]) if c is not None))
+    manifest = get_manifest(key)
+    missing = [c for c in columns if c not in manifest["columns"]]
+    if missing:
+        raise ValueError(f"Column '{missing[0]}' not found in DataFrame.")
+    args = chart_cache.normalise(options)
+    return memoize(
+        key, "chart-data",
+        lambda: chart_spec(get_columns(columns, key=key), **args),
+        sorted(args.items()),
+    )
+
+
 @router.post("/plot-chart")
-async def generate_chart(req: ChartRequest):
+async def generate_chart(req: ChartRequest, request: Request, response: Response, key: str = Depends(dataset_key),
+                         x_session_id: Optional[str] = Header(None)):
     print(req.dict())
-    df = get_df()
-    if df is None:
+    # Redis is queried off the event loop, like every other blocking call here
+    manifest = await run_in_threadpool(get_manifest, key)
+    if manifest is None:
         raise AppException("No DataFrame found")
 
-    chart = plot_chart(
-        data=df,
+    options = dict(
         chart=req.chart_type,
         x=req.x,
         y=req.y,
@@ -44,8 +113,136 @@ async def generate_chart(req: ChartRequest):
         kde=req.kde,
         multiple=req.multiple,
         cols=req.cols,
+        max_points=req.max_points,
     )
+    # only a socket of the request's own session gets pushes (and has them cancelled)
+    push = req.sid is not None and await run_in_threadpool(owns_socket, req.sid, x_session_id)
+    if push:
+        await cancel_push(req.sid)  # this request supersedes the client's previous chart
+
+    if req.output == "data":
+        try:
+            if req.y:
+                chart = list(await asyncio.gather(*[
+                    run_in_threadpool(_chart_data, key, {**options, "y": col}) for col in req.y
+                ]))
+            else:
+                chart = await run_in_threadpool(_chart_data, key, {**options, "y": None})
+        except ValueError as e:
+            raise AppException(str(e), status_code=400)
+        return {"data": chart}
+
+    try:
+        if push and not _is_cached(key, manifest, options, req.y):
+            return await _progressive(req, request, response, key, manifest, options)
+        # Each y column is its own chart (and cache entry); they are
+        # rendered in the chart worker pool, off the event loop
+        chart, sampling = await _charts(request, key, manifest, options, req.y)
+    except ValueError as e:
+        raise AppException(str(e), status_code=400)
+
+    # charts drawn from a sample say so, without changing the shape of `data`
+    note = _sampling_note(sampling)
+    if note is None:
+        return {"data": chart}
+    response.headers["X-Chart-Sampling"] = json.dumps(sampling)
+    return {"data": chart, "message": note}
+
+
+async def _progressive(req: ChartRequest, request: Request, response: Response, key: str, manifest: dict, options: dict):
+    """Answer with a preview within PREVIEW_TIMEOUT and push the full chart
+    to the client's socket when it is ready."""
+    async def full():
+        chart, sampling = await _charts(request, key, manifest, options, req.y, background=True)
+        return chart, _sampling_note(sampling)
+
+    # the full render starts once the preview is out of the way (or late),
+    # so a request the preview rejects never reaches the socket
+    try:
+        chart, sampling = await _charts(request, key, manifest, preview_options(options), req.y, timeout=PREVIEW_TIMEOUT)
+    except AppException as e:
+        if e.status_code != 504:
+            raise
+        response.headers["X-Chart-Render"] = await start_push(req.sid, full)
+        return {"data": None, "message": "Rendering, the chart will be pushed when ready"}
+    response.headers["X-Chart-Render"] = await start_push(req.sid, full)
+
+    note = _sampling_note(sampling)
+    if note is not None:
+        response.headers["X-Chart-Sampling"] = json.dumps(sampling)
+    return {"data": chart, "message": "Preview, the full resolution chart will be pushed when ready"
+            + (f" ({note})" if note else "")}
+
+
+@router.post("/plot-batch")
+async def generate_charts(req: BatchChartRequest, request: Request, key: str = Depends(dataset_key)):
+    """
+    A chart per (x, y) column pair, rendered concurrently and streamed as
+    NDJSON in the order they finish:
+
+        {"x": ..., "y": ..., "success": true, "data": <url or data spec>, "message": ...}
+
+    With `facet`, a single line for one figure holding every pair.
+    """
+    manifest = await run_in_threadpool(get_manifest, key)
+    if manifest is None:
+        raise AppException("No DataFrame found")
+
+    xs = req.x if isinstance(req.x, list) else [req.x]
+    ys = req.y or [None]
+    options = dict(
+        chart=req.chart_type,
+        hue=req.hue,
+        style=req.style,
+        size=req.size,
+        kde=req.kde,
+        multiple=req.multiple,
+        cols=req.cols,
+        max_points=req.max_points,
+    )
+    if req.facet:
+        if req.output == "data":
+            raise AppException("Faceted charts are only rendered as png")
+        panels = [[x, y] for x in xs for y in ys]
+        jobs = [(req.x, req.y, lambda: _chart_url(request, key, manifest, {**options, "panels": panels}, background=True))]
+    elif req.output == "data":
+        async def spec(x, y):
+            return await run_in_threadpool(_chart_data, key, {**options, "x": x, "y": y}), None
+        jobs = [(x, y, lambda x=x, y=y: spec(x, y)) for x in xs for y in ys]
+    else:
+        jobs = [
+            (x, y, lambda x=x, y=y: _chart_url(request, key, manifest, {**options, "x": x, "y": y}, background=True))
+            for x in xs for y in ys
+        ]
+
+    # a batch keeps at most one render per worker in flight, leaving the
+    # pool queue to other requests
+    slots = asyncio.Semaphore(POOL_SIZE)
+
+    async def run(x, y, job):
+        line = {"x": x, "y": y, "success": False, "data": None}
+        try:
+            async with slots:
+                data, sampling = await job()
+            line.update(success=True, data=data, message=_sampling_note(sampling) or "OK")
+        except AppException as e:
+            line["message"] = e.message
+        except ValueError as e:
+            line["message"] = str(e)
+        except Exception as e:
+            # any other renderer error fails this pair only, not the stream
+            print(f"[ERROR] Batch chart {x} / {y} failed: {e!r}")
+            line["message"] = "Internal Server Error"
+        return json.dumps(line) + "\n"
 
-    return {"data": chart}
-    # return {"data": "chart"}
+    async def stream():
+        tasks = [asyncio.ensure_future(run(*job)) for job in jobs]
+        try:
+            for done in asyncio.as_completed(tasks):
+                yield await done
+        finally:
+            # the client went away: drop what has not started yet
+            for task in tasks:
+                task.cancel()
 
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
@@ -0,0 +1,57 @@
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+from typing import List, Literal, Optional
+from main.callbacks.df_manager import get_columns, get_manifest, dataset_key
+from main.utils.errors import AppException
+from main.functions.export import FORMATS, BATCH_ROWS, export_stream
+from main.functions.paging import sort_positions
+from main.utils.etag import conditional_get
+
+
+router = APIRouter(prefix="/export")
+
+
+@router.get("")
+def export_dataset(
+    cache_headers: dict = Depends(conditional_get),
+    format: Literal["csv", "ndjson", "parquet", "arrow"] = "csv",
+    columns: Optional[List[str]] = Query(None),
+    sort: Optional[str] = None,
+    order: Literal["asc", "desc"] = "asc",
+    offset: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1),
+    batch_rows: int = Query(BATCH_ROWS, ge=1000, le=1_000_000),
+    key: str = Depends(dataset_key),
+):
+    """Stream the dataset (or a projected / sorted / sliced view of it)."""
+    manifest = get_manifest(key)
+    if manifest is None:
+        raise AppException("No DataFrame found", status_code=404)
+
+    columns = columns or manifest["columns"]
+    needed = columns if sort is None or sort in columns else columns + [sort]
+    df = get_columns(needed, key=key)
+
+    end = None if limit is None else offset + limit
+    positions = None
+    if sort is not None:
+        cache_key = (key, manifest.get("generation"), sort, manifest["col_versions"].get(sort),
+                     manifest["index_version"])
+        positions = sort_positions(df[sort], order == "desc", cache_key)[offset:end]
+    elif offset or end is not None:
+        df = df.iloc[offset:end]
+
+    try:
+        stream = export_stream(df[columns], format, batch_rows=batch_rows, positions=positions)
+    except ValueError as e:
+        raise AppException(str(e), status_code=400)
+
+    media_type, extension = FORMATS[format]
+    return StreamingResponse(
+        stream,
+        media_type=media_type,
+        headers={
+            **cache_headers,
+            "Content-Disposition": f'attachment; filename="{key.split(":")[-1]}.{extension}"',
+        },
+    )
@@ -1,10 +1,19 @@
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Request
 import pandas as pd
-from main.callbacks.df_manager import get_df, set_df
+from typing import List, Literal, Optional
+from main.callbacks.df_manager import set_df, get_df, get_columns, get_manifest, numeric_columns, dataset_key, cache_stats
+from main.callbacks.memo import memoize
+from main.callbacks.profiles import get_profiles, get_sketches, put_sketches
+from main.callbacks.correlation import correlation_for
 from main.utils.errors import AppException
 from main.sockets.events import connected_clients
-from main.functions.summary import df_summary_info,columns_info,stats,unique_values
+from main.functions.summary import summary_from_profiles,columns_info_from_profiles,stats_from_profiles,sketch_profiles,unique_values
+from main.functions.ingest import read_csv_optimized, schema, preview_records
+from main.functions.paging import page
+from main.functions.correlation import triplets
+from main.utils.df_response import DataFrameResponse
+from main.utils.etag import conditional_get
 
 
 # router = APIRouter(prefix="/general")
@@ -18,65 +27,143 @@ def root():
 def list_clients():
     return {"connected_clients": len(list(connected_clients))}
 
+@router.get("/cache-stats")
+def get_cache_stats():
+    return {"data": cache_stats(), "message": "Dataset cache statistics"}
+
 @router.get("/upload")
-def upload():
-    df=pd.read_csv("main/data.csv")
-    set_df(df)
-    df = df.where(pd.notnull(df), None)
+def upload(preview: int = 100, key: str = Depends(dataset_key)):
+    sketches={}
+    df=read_csv_optimized("main/data.csv", sketches=sketches)
+    version=set_df(df, key=key)
+    put_sketches(key, sketches, version)
     return {
-        "data": {'data': df.to_dict(orient="records"),'filename':'MyData'},
+        "data": {
+            'data': preview_records(df, preview),
+            'schema': schema(df),
+            'rows': len(df),
+            'filename':'MyData',
+        },
         "message": "DataFrame UPloaded",
     }
 
 
 
-@router.get("/summary")
-def summary(df: pd.DataFrame = Depends(get_df)):
-    data=df_summary_info(df)
+def _profiles(key: str, approx: bool = False, columns=None):
+    """Exact per-column profiles, or with `approx` the ones derived from
+    sketches (HyperLogLog distinct counts, KLL quartiles), which never need
+    more than a bounded amount of memory per column."""
+    if not approx:
+        return get_profiles(key, columns)
+    manifest, sketches = get_sketches(key, columns)
+    return manifest, sketch_profiles(sketches, manifest["dtypes"])
+
+
+def _stats(key: str, approx: bool) -> list:
+    # only the numeric columns are profiled, text columns are never loaded
+    manifest = get_manifest(key)
+    if manifest is None:
+        raise AppException("No DataFrame found", status_code=404)
+    return stats_from_profiles(_profiles(key, approx, numeric_columns(manifest))[1])
+
+
+def _summary(key: str, approx: bool) -> dict:
+    manifest, profiles = _profiles(key, approx)
+    return summary_from_profiles(profiles, manifest["rows"])
+
+
+@router.get("/summary", dependencies=[Depends(conditional_get)])
+def summary(approx: bool = False, key: str = Depends(dataset_key)):
+    data=memoize(key, "summary", lambda: _summary(key, approx), approx)
     return {
         "data": data,
         "message": "DataFrame summary",
     }
 
-@router.get("/column-info")
-def summary(df: pd.DataFrame = Depends(get_df)):
-    print(df.shape)
-    data=columns_info(df)
+@router.get("/column-info", dependencies=[Depends(conditional_get)])
+def summary(approx: bool = False, key: str = Depends(dataset_key)):
+    data=memoize(key, "column-info", lambda: columns_info_from_profiles(_profiles(key, approx)[1]), approx)
     return {
         "data": data,
         "message": "Column Info",
     }
     
-@router.get("/stats")
-def summary(df: pd.DataFrame = Depends(get_df)):
-    data=stats(df)
+@router.get("/stats", dependencies=[Depends(conditional_get)])
+def summary(approx: bool = False, key: str = Depends(dataset_key)):
+    data=memoize(key, "stats", lambda: _stats(key, approx), approx)
     return {
         "data": data,
         "message": "Descriptive Statistics",
     }
 
-@router.get("/unique-values")
-def summary(df: pd.DataFrame = Depends(get_df)):
-    data=unique_values(df)
+@router.get("/unique-values", dependencies=[Depends(conditional_get)])
+def summary(
+    limit: int = Query(20, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    column: Optional[str] = None,
+    key: str = Depends(dataset_key),
+):
+    # `column` pages through the tail of any one column without loading the rest
+    def compute():
+        df = get_df(key) if column is None else get_columns([column], key=key)
+        if df is None:
+            raise AppException("No DataFrame found", status_code=404)
+        return unique_values(df, limit, offset, every_column=column is not None)
+    data=memoize(key, "unique-values", compute, limit, offset, column)
     return {
         "data": data,
         "message": "Unique Values",
     }
 
 
-@router.get("/raw-data")
-def get_raw_data(df: pd.DataFrame = Depends(get_df)):
-    df = df.where(pd.notnull(df), None)  # replace NaN/NaT with None
+@router.get("/correlation", dependencies=[Depends(conditional_get)])
+async def correlation(
+    request: Request,
+    method: Literal["pearson", "spearman", "kendall"] = "pearson",
+    columns: Optional[List[str]] = Query(None),
+    key: str = Depends(dataset_key),
+):
+    # cached per dataset version, method and column set; see callbacks.correlation
+    corr = await correlation_for(request, key, method, columns)
     return {
-        "data": df.to_dict(orient="records"),
-        "message": "Summary DataFrame fetched successfully"
+        "data": {"method": method, "columns": corr["columns"], "data": triplets(corr["matrix"])},
+        "message": "Correlation Matrix",
     }
 
 
+@router.get("/raw-data")
+def get_raw_data(
+    cache_headers: dict = Depends(conditional_get),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=5000),
+    columns: Optional[List[str]] = Query(None),
+    sort: Optional[str] = None,
+    order: Literal["asc", "desc"] = "asc",
+    key: str = Depends(dataset_key),
+):
+    manifest = get_manifest(key)
+    if manifest is None:
+        raise AppException("No DataFrame found", status_code=404)
+
+    columns = columns or manifest["columns"]
+    needed = columns if sort is None or sort in columns else columns + [sort]
+    df = get_columns(needed, key=key)
+    cache_key = None if sort is None else (
+        key, manifest.get("generation"), sort, manifest["col_versions"].get(sort), manifest["index_version"]
+    )
+    rows = page(df, offset, limit, sort=sort, descending=order == "desc", cache_key=cache_key)
+    return DataFrameResponse(
+        rows[columns],
+        message="Summary DataFrame fetched successfully",
+        extra={"total": manifest["rows"], "offset": offset, "limit": limit},
+        headers=cache_headers,
+    )
+
+
 @router.post("/update-df")
-def update_df():
+def update_df(key: str = Depends(dataset_key)):
     df = pd.DataFrame({"name": ["Alice", "Bob"], "age": [25, 30]})
-    set_df(df)
+    set_df(df, key=key)
     return {}
 
 
@@ -1,27 +1,28 @@
 from fastapi import APIRouter, Depends
 import pandas as pd
-from main.callbacks.df_manager import get_df, set_df
+from main.callbacks.df_manager import get_columns, current_df, dataset_key, transaction
 from main.utils.errors import AppException
 from main.sockets.events import connected_clients
 from main.functions.preprocessing import fill_missing_column,find_outliers
+from main.utils.df_response import DataFrameResponse
+from main.utils.etag import conditional_get
 
 
 router = APIRouter(prefix="/preprocessing")
 
 
 @router.post("/fill-nulls")
-def fill_nulls(column: str, method: str):
+def fill_nulls(column: str, method: str, key: str = Depends(dataset_key)):
     print(column, method)
-    df: pd.DataFrame =get_df()
-    df[column] = fill_missing_column(col=df[column], method=method)
-    set_df(df)
+    with transaction(key, columns=[column]) as tx:
+        tx.df[column] = fill_missing_column(col=tx.df[column], method=method)
     return {
         "message": f"Filling nulls in column '{column}' using method '{method}'"
     }
 
-@router.get("/detect-outliers")
-def detect_outliers(column: str, method: str):
-    df: pd.DataFrame = get_df()
+@router.get("/detect-outliers", dependencies=[Depends(conditional_get)])
+def detect_outliers(column: str, method: str, key: str = Depends(dataset_key)):
+    df: pd.DataFrame = get_columns([column], key=key)
     outliers = find_outliers(series=df[column], method=method)  
     #print(outliers)
     return {
@@ -34,19 +35,23 @@ def remove_outliers(column: str, method: str, **kwargs):
     pass
 
 @router.get("/duplicates")
-def detect_duplicates(df: pd.DataFrame = Depends(get_df)):
+def detect_duplicates(cache_headers: dict = Depends(conditional_get), df: pd.DataFrame = Depends(current_df)):
     duplicates = df[df.duplicated(keep=False)]  # keep=False -> keep all duplicate rows
     has_duplicates = df.duplicated().sum() > 0
 
-    return {
-        "data": duplicates.to_dict(orient="records"),
-        "message": "Detecting duplicates" if has_duplicates else "No duplicates found"
-    }
+    return DataFrameResponse(
+        duplicates,
+        orient="records",
+        message="Detecting duplicates" if has_duplicates else "No duplicates found",
+        headers=cache_headers,
+    )
 
 @router.get("/drop-duplicates")
-def drop_duplicates(df: pd.DataFrame = Depends(get_df)):
-    df.drop_duplicates(inplace=True)
-    set_df(df)
+def drop_duplicates(key: str = Depends(dataset_key)):
+    with transaction(key) as tx:
+        dropped = len(tx.df)
+        tx.df = tx.df.drop_duplicates()
+        dropped -= len(tx.df)
     return {
-        "message": f"Dropping duplicates in column '{column}'"
+        "message": f"Dropped {dropped} duplicate rows"
     }
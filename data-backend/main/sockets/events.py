@@ -1,4 +1,6 @@
+import os
 import socketio
+from fastapi.concurrency import run_in_threadpool
 from langchain.memory import ConversationBufferMemory
 from langchain.schema import SystemMessage, HumanMessage, AIMessage
 from main.utils.errors import AppException
@@ -7,13 +9,26 @@ from main.callbacks.word_buffer import WordBufferingCallback
 from main.config.llm_config import ChatOpenRouter
 from main.config.settings import SYSTEM_PROMPT
 
+# Emits go through Redis, so any uvicorn worker can reach a socket connected
+# to another one (e.g. a chart push from the worker that got the HTTP request)
+SOCKETIO_REDIS_URL = os.getenv("SOCKETIO_REDIS_URL", "redis://localhost:6379/0")
+
 connected_clients = set()
-sio = socketio.AsyncServer(async_mode="asgi",cors_allowed_origins="http://localhost:3000" )
+sio = socketio.AsyncServer(
+    async_mode="asgi",
+    cors_allowed_origins="http://localhost:3000",
+    client_manager=socketio.AsyncRedisManager(SOCKETIO_REDIS_URL),
+)
 
 
 @sio.event
-async def connect(sid, environ):
+async def connect(sid, environ, auth=None):
+    from main.callbacks.chart_push import register_socket
     connected_clients.add(sid)
+    # the dataset session the socket belongs to (as in X-Session-Id), so
+    # HTTP requests can only push to sockets of their own session
+    session = (auth or {}).get("session") or environ.get("HTTP_X_SESSION_ID")
+    await run_in_threadpool(register_socket, sid, session)
     print(f"Client connected: {sid}")
     await sio.emit("welcome", "Welcome!", to=sid)
 
@@ -62,4 +77,7 @@ async def message(sid, data: str):
 @sio.event
 async def disconnect(sid):
     connected_clients.discard(sid)
+    from main.callbacks.chart_push import cancel_push, forget_socket
+    await cancel_push(sid)  # nobody left to push its chart to
+    await run_in_threadpool(forget_socket, sid)
     print(f"Client disconnected: {sid}")
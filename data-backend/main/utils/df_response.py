@@ -0,0 +1,63 @@
+import numpy as np
+import orjson
+import pandas as pd
+from fastapi.responses import Response
+
+# Responses that already carry the {success, data, message} envelope set
+# this header so ResponseMiddleware passes them through untouched.
+ENVELOPE_HEADER = "x-envelope"
+
+ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def _column_values(series: pd.Series):
+    """One column as something orjson can write directly (NaN/NaT -> null)."""
+    dtype = series.dtype
+    if isinstance(dtype, np.dtype) and dtype.kind in "iufb":
+        # numpy arrays are serialised natively; orjson writes NaN as null
+        return np.ascontiguousarray(series.to_numpy())
+    if isinstance(dtype, np.dtype) and dtype.kind == "M":
+        values = np.datetime_as_string(series.to_numpy(), unit="auto").astype(object)
+        values[series.isna().to_numpy()] = None
+        return values.tolist()
+    return series.astype(object).where(series.notna(), None).tolist()
+
+
+def encode_columns(df: pd.DataFrame) -> dict:
+    """Columnar layout: column names plus one value array per column."""
+    return {
+        "columns": list(df.columns),
+        "data": {col: _column_values(df[col]) for col in df.columns},
+    }
+
+
+def encode_records(df: pd.DataFrame) -> list:
+    columns = [_column_values(df[col]) for col in df.columns]
+    columns = [c.tolist() if isinstance(c, np.ndarray) else c for c in columns]
+    return [dict(zip(df.columns, row)) for row in zip(*columns)]
+
+
+class DataFrameResponse(Response):
+    """
+    JSON response for DataFrame payloads, encoded once with orjson and
+    already wrapped in the API envelope:
+
+        {"success": true, "message": ..., "data": {"columns": [...], "data": {col: [...]}, ...extra}}
+
+    `orient="records"` emits a list of row objects instead, for clients that
+    still expect that shape.
+    """
+    media_type = "application/json"
+
+    def __init__(self, df: pd.DataFrame, message: str = "OK", extra: dict = None,
+                 orient: str = "columns", status_code: int = 200, headers: dict = None):
+        if orient == "records":
+            data = encode_records(df)
+        else:
+            data = {**encode_columns(df), "rows": len(df), **(extra or {})}
+        body = orjson.dumps(
+            {"success": status_code < 400, "data": data, "message": message},
+            option=ORJSON_OPTIONS,
+            default=str,
+        )
+        super().__init__(body, status_code=status_code, headers={**(headers or {}), ENVELOPE_HEADER: "1"})
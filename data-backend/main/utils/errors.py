@@ -3,6 +3,7 @@ from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
 from main.middleware.response import APIResponse
+from main.utils.df_response import ENVELOPE_HEADER
 
 
 # Custom exception
@@ -13,6 +14,10 @@ class AppException(Exception):
         self.extra = extra
         super().__init__(message)
 
+    def __reduce__(self):
+        # keep the status code when raised in a worker process
+        return (AppException, (self.message, self.status_code, self.extra))
+
 
 # Handle custom exception
 async def app_exception_handler(request: Request, exc: AppException):
@@ -22,5 +27,6 @@ async def app_exception_handler(request: Request, exc: AppException):
             success=False,
             data=None,
             message=exc.message
-        ).dict()
+        ).dict(),
+        headers={ENVELOPE_HEADER: "1"},
     )
@@ -0,0 +1,49 @@
+import hashlib
+from fastapi import Depends, Request, Response
+from main.callbacks.df_manager import dataset_key, get_manifest
+
+
+class NotModified(Exception):
+    """Raised by `conditional_get` when the client's copy is still current."""
+
+    def __init__(self, etag: str):
+        self.etag = etag
+        super().__init__(etag)
+
+
+def _headers(etag: str) -> dict:
+    # always revalidate, but let the browser keep the body for 304s
+    return {"ETag": etag, "Cache-Control": "no-cache", "Vary": "X-Session-Id"}
+
+
+def _matches(header: str, etag: str) -> bool:
+    if not header:
+        return False
+    candidates = [tag.strip() for tag in header.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def conditional_get(request: Request, response: Response, key: str = Depends(dataset_key)):
+    """
+    Route dependency for read-only endpoints. The ETag is derived from the
+    dataset version (and generation, as versions start again at 1 if Redis
+    loses the dataset) and the request parameters only, so a matching
+    If-None-Match is answered with 304 before the DataFrame is touched.
+
+    Returns the caching headers; routes that build their own Response
+    (DataFrameResponse, StreamingResponse) must pass them on themselves.
+    """
+    manifest = get_manifest(key) or {}
+    version, generation = manifest.get("version", 0), manifest.get("generation")
+    params = sorted(request.query_params.multi_items())
+    digest = hashlib.sha1(f"{key}|{generation}|{version}|{request.url.path}|{params}".encode()).hexdigest()
+    etag = f'"{digest}"'
+    if version and _matches(request.headers.get("if-none-match"), etag):
+        raise NotModified(etag)
+    headers = _headers(etag)
+    response.headers.update(headers)
+    return headers
+
+
+async def not_modified_handler(request: Request, exc: NotModified):
+    return Response(status_code=304, headers=_headers(exc.etag))
@@ -0,0 +1,11 @@
+from starlette.staticfiles import StaticFiles
+
+
+class ImmutableStaticFiles(StaticFiles):
+    """Static files whose content never changes under the same name (e.g.
+    content-hashed charts), so browsers may cache them for good."""
+
+    def file_response(self, *args, **kwargs):
+        response = super().file_response(*args, **kwargs)
+        response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        return response
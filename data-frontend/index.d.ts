@@ -42,6 +42,9 @@ interface DescriptiveStatistics {
 interface UniqueValues {
   column: string;
   unique_values: string[] ;
+  counts: number[];
+  total_unique: number;
+  more: boolean;
 }
 
 interface History {
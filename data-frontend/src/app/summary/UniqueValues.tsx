@@ -47,24 +47,19 @@ function UniqueValues() {
         <Table>
           <TableHeader>
             <TableRow>
-              {uniqueValues[0] &&
-                Object.keys(uniqueValues[0]).map((key) => (
-                  <TableHead key={key} className="capitalize">
-                    {key}
-                  </TableHead>
-                ))}
+              <TableHead className="capitalize">column</TableHead>
+              <TableHead className="capitalize">unique values</TableHead>
             </TableRow>
           </TableHeader>
           <TableBody>
-            {uniqueValues.map((stat, i) => (
-              <TableRow key={i}>
-                {Object.values(stat).map((value) => (
-                  <TableCell key={value} className="capitalize">
-                    {Array.isArray(value) && typeof value[0] === "string"
-                      ? value.join(", ")
-                      : value ?? "—"}
-                  </TableCell>
-                ))}
+            {uniqueValues.map((stat) => (
+              <TableRow key={stat.column}>
+                <TableCell className="capitalize">{stat.column}</TableCell>
+                <TableCell className="capitalize">
+                  {stat.unique_values.length ? stat.unique_values.join(", ") : "—"}
+                  {stat.more &&
+                    ` … (+${(stat.total_unique - stat.unique_values.length).toLocaleString()} more)`}
+                </TableCell>
               </TableRow>
             ))}
           </TableBody>